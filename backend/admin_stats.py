@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Admin dashboard counters, computed server-side with one grouped
+# aggregation per collection and kept as a materialized snapshot document
+# that a background task refreshes every `interval` seconds. Reads are a
+# single _id lookup no matter how large the collections grow.
+
+SNAPSHOT_ID = "admin"
+
+def _count_where(field: str, value) -> dict:
+    return {"$sum": {"$cond": [{"$eq": [f"${field}", value]}, 1, 0]}}
+
+async def _first(cursor) -> dict:
+    rows = await cursor.to_list(1)
+    return rows[0] if rows else {}
+
+async def compute_stats(db) -> dict:
+    users, orders, campaigns, total_services, total_chats = await asyncio.gather(
+        _first(db.users.aggregate([
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "sellers": _count_where("userType", "seller"),
+                "managers": _count_where("userType", "manager")
+            }}
+        ])),
+        _first(db.orders.aggregate([
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "revenue": {"$sum": {"$ifNull": ["$price", 0]}},
+                "pending": _count_where("status", "in_progress"),
+                "completed": _count_where("status", "completed")
+            }}
+        ], allowDiskUse=True)),
+        _first(db.campaigns.aggregate([
+            {"$group": {"_id": None, "total": {"$sum": 1}, "budget": {"$sum": {"$ifNull": ["$budget", 0]}}}}
+        ])),
+        db.services.estimated_document_count(),
+        db.manager_chats.estimated_document_count()
+    )
+
+    return {
+        "totalUsers": users.get('total', 0),
+        "totalOrders": orders.get('total', 0),
+        "totalRevenue": orders.get('revenue', 0) + campaigns.get('budget', 0),
+        "totalServices": total_services,
+        "pendingOrders": orders.get('pending', 0),
+        "completedOrders": orders.get('completed', 0),
+        "activeInfluencers": users.get('sellers', 0),
+        "totalCampaigns": campaigns.get('total', 0),
+        "totalManagers": users.get('managers', 0),
+        "totalChats": total_chats
+    }
+
+class StatsSnapshot:
+    def __init__(self, db, interval: float = 60, collection: str = "stats_snapshots"):
+        self.db = db
+        self.interval = interval
+        self.collection_name = collection
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def refresh(self) -> dict:
+        stats = await compute_stats(self.db)
+        computed_at = datetime.utcnow()
+        await self.collection.update_one(
+            {"_id": SNAPSHOT_ID},
+            {"$set": {"stats": stats, "computedAt": computed_at}},
+            upsert=True
+        )
+        return {**stats, "computedAt": computed_at}
+
+    async def get(self, fresh: bool = False) -> dict:
+        if not fresh:
+            snapshot = await self.collection.find_one({"_id": SNAPSHOT_ID})
+            if snapshot:
+                return {**snapshot['stats'], "computedAt": snapshot['computedAt']}
+        return await self.refresh()
+
+    async def start(self):
+        if self.interval > 0:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError:
+                logger.exception("Admin stats refresh failed")
+            await asyncio.sleep(self.interval)
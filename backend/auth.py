@@ -4,14 +4,33 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from cache import TTLCache
+import asyncio
+import hashlib
+import multiprocessing
 import os
+import time
 
 SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
 ALGORITHM = 'HS256'
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# bcrypt runs in a process pool so a login burst cannot stall the event loop
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 64))
+
+# Verified claims keyed by token digest, each entry expiring at the token's exp
+JWT_CACHE_ENABLED = os.environ.get('JWT_CACHE_ENABLED', 'true').lower() == 'true'
+token_cache = TTLCache(maxsize=int(os.environ.get('JWT_CACHE_SIZE', 10000)))
+
 pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+_hash_executor: Optional[ProcessPoolExecutor] = None
+_hash_pending = 0
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -19,6 +38,57 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def _get_hash_executor() -> ProcessPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        # spawn, not fork: the pool starts lazily, after Motor's monitor
+        # threads are running, and forking a threaded process is unsafe
+        _hash_executor = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _hash_executor
+
+def _discard_hash_pool(broken: ProcessPoolExecutor):
+    global _hash_executor
+    if _hash_executor is broken:
+        _hash_executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+async def _run_in_hash_pool(func, *args):
+    """Run a bcrypt call in the pool, failing fast with 503 when the queue is full"""
+    global _hash_pending
+    if _hash_pending >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail='Authentication service is busy, please retry',
+            headers={'Retry-After': '1'},
+        )
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        executor = _get_hash_executor()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # A crashed worker breaks the pool for good; replace it and retry once
+            _discard_hash_pool(executor)
+            return await loop.run_in_executor(_get_hash_executor(), func, *args)
+    finally:
+        _hash_pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+def shutdown_hash_pool():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -30,15 +100,26 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def decode_token(token: str) -> dict:
+    if JWT_CACHE_ENABLED:
+        cache_key = hashlib.sha256(token.encode()).digest()
+        payload = token_cache.get(cache_key)
+        if payload is not None:
+            return payload
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Could not validate credentials',
             headers={'WWW-Authenticate': 'Bearer'},
         )
+    
+    if JWT_CACHE_ENABLED and 'exp' in payload:
+        remaining = payload['exp'] - time.time()
+        if remaining > 0:
+            token_cache.set(cache_key, payload, ttl=remaining)
+    return payload
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
@@ -51,6 +132,21 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         )
     return {'user_id': user_id, 'email': payload.get('email')}
 
+async def get_current_user_or_token(
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """get_current_user that also takes ?token=, for clients that can't set headers (EventSource)"""
+    if credentials is None:
+        if not token:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail='Not authenticated',
+                headers={'WWW-Authenticate': 'Bearer'},
+            )
+        credentials = HTTPAuthorizationCredentials(scheme='Bearer', credentials=token)
+    return await get_current_user(credentials)
+
 async def get_optional_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
     if credentials is None:
         return None
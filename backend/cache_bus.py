@@ -0,0 +1,154 @@
+import asyncio
+import inspect
+import logging
+import os
+import socket
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Cross-worker cache invalidation over a capped collection. Every worker
+# publishes entity-change events and tails the collection with a tailable
+# cursor, evicting matching keys for events published by other workers.
+# Needs nothing beyond a plain mongod (no replica set). Each event is
+# dispatched at most once per worker, including across cursor reopens.
+
+# How far before the last seen event a reopened cursor starts: ObjectIds
+# minted by different processes are not strictly ordered, so resuming at
+# exactly the last _id could skip a slightly "older" one. Events inside the
+# window that were already dispatched are recognised by _id and skipped.
+REOPEN_REWIND_SECONDS = 5
+SEEN_IDS = 10000
+
+Handler = Callable[[Optional[str]], Union[None, Awaitable[None]]]
+
+class InvalidationBus:
+    def __init__(
+        self,
+        db,
+        handlers: Dict[str, Handler],
+        collection: str = "cache_events",
+        size: int = 16 * 1024 * 1024,
+        enabled: bool = True
+    ):
+        self.db = db
+        self.handlers = handlers
+        self.collection_name = collection
+        self.size = size
+        self.enabled = enabled
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.published = 0
+        self.received = 0
+        self.max_lag_ms = 0.0
+        self.total_lag_ms = 0.0
+        self.reopened = 0
+        self._task: Optional[asyncio.Task] = None
+        self._seen = set()
+        self._seen_order = deque()
+        self._last_seen: Optional[datetime] = None
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def start(self):
+        if not self.enabled:
+            return
+        try:
+            await self.db.create_collection(self.collection_name, capped=True, size=self.size)
+        except CollectionInvalid:
+            pass
+        # A tailable cursor whose query matches nothing dies at once, so
+        # start from a marker event of our own
+        marker = await self.collection.insert_one({"entity": "noop", "origin": self.origin, "createdAt": datetime.utcnow()})
+        self._task = asyncio.ensure_future(self._tail(marker.inserted_id))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def publish(self, entity: str, key: Optional[str] = None):
+        if not self.enabled:
+            return
+        try:
+            await self.collection.insert_one({
+                "entity": entity,
+                "key": key,
+                "origin": self.origin,
+                "createdAt": datetime.utcnow()
+            })
+            self.published += 1
+        except PyMongoError:
+            logger.exception(f"Failed to publish {entity} invalidation")
+
+    async def _tail(self, start_id: ObjectId):
+        query = {"_id": {"$gte": start_id}}
+        while True:
+            try:
+                cursor = self.collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                # Motor ends an async for whenever an awaited batch comes back
+                # empty; the cursor itself stays open until it is killed
+                while cursor.alive:
+                    async for event in cursor:
+                        await self._dispatch(event)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError:
+                logger.exception("Invalidation bus cursor failed, reopening")
+            if self._last_seen is not None:
+                rewind = self._last_seen - timedelta(seconds=REOPEN_REWIND_SECONDS)
+                query = {"_id": {"$gte": ObjectId.from_datetime(rewind)}}
+            self.reopened += 1
+            await asyncio.sleep(1)
+
+    def _first_sighting(self, event_id) -> bool:
+        if event_id in self._seen:
+            return False
+        self._seen.add(event_id)
+        self._seen_order.append(event_id)
+        if len(self._seen_order) > SEEN_IDS:
+            self._seen.discard(self._seen_order.popleft())
+        if isinstance(event_id, ObjectId):
+            seen_at = event_id.generation_time
+            if self._last_seen is None or seen_at > self._last_seen:
+                self._last_seen = seen_at
+        return True
+
+    async def _dispatch(self, event: dict):
+        if not self._first_sighting(event.get('_id')):
+            return
+        if event.get('origin') == self.origin:
+            return
+        handler = self.handlers.get(event.get('entity'))
+        if handler is None:
+            return
+
+        lag_ms = (datetime.utcnow() - event['createdAt']).total_seconds() * 1000
+        self.received += 1
+        self.total_lag_ms += lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        try:
+            result = handler(event.get('key'))
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception(f"Invalidation handler for {event.get('entity')} failed")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "origin": self.origin,
+            "published": self.published,
+            "received": self.received,
+            "reopened": self.reopened,
+            "avgLagMs": round(self.total_lag_ms / self.received, 2) if self.received else 0.0,
+            "maxLagMs": round(self.max_lag_ms, 2)
+        }
@@ -0,0 +1,111 @@
+import asyncio
+import os
+from pathlib import Path
+
+from pymongo.errors import DuplicateKeyError
+
+# Materialized manager-chat conversation summaries, one document per
+# participant pair keyed by pair_key(). send_manager_message upserts the
+# summary in the same request that inserts the message, so conversation
+# lists read a small indexed collection instead of message history.
+#
+#     python conversations.py   rebuild summaries from manager_chats
+
+RECENT_MESSAGES = 5
+
+# Conversations ordered by latest activity; _id is the pair key
+CONVERSATION_SORT = [("lastMessageTime", -1), ("_id", 1)]
+
+def pair_key(user_a: str, user_b: str) -> str:
+    return ":".join(sorted((user_a, user_b)))
+
+async def record_message(db, message: dict):
+    """Fold a newly inserted manager_chats message into its conversation summary"""
+    sender_id, recipient_id = message['senderId'], message['recipientId']
+    user1_id, user2_id = sorted((sender_id, recipient_id))
+    update = {
+        "$setOnInsert": {
+            "user1Id": user1_id,
+            "user2Id": user2_id,
+            "participants": [user1_id, user2_id],
+            "createdAt": message['createdAt']
+        },
+        "$set": {
+            "lastMessage": message['message'],
+            "lastSenderId": sender_id
+        },
+        "$max": {"lastMessageTime": message['createdAt']},
+        "$inc": {"messageCount": 1, f"unread.{recipient_id}": 1},
+        "$push": {"recentMessages": {
+            "$each": [{
+                "senderId": sender_id,
+                "recipientId": recipient_id,
+                "message": message['message'],
+                "createdAt": message['createdAt']
+            }],
+            "$position": 0,
+            "$slice": RECENT_MESSAGES
+        }}
+    }
+    key = pair_key(sender_id, recipient_id)
+    try:
+        await db.conversations.update_one({"_id": key}, update, upsert=True)
+    except DuplicateKeyError:
+        # Lost an upsert race for a brand-new pair; the document exists now
+        await db.conversations.update_one({"_id": key}, update)
+
+async def mark_read(db, user_id: str, other_user_id: str):
+    await db.conversations.update_one(
+        {"_id": pair_key(user_id, other_user_id), f"unread.{user_id}": {"$gt": 0}},
+        {"$set": {f"unread.{user_id}": 0}}
+    )
+
+async def rebuild_conversations(db):
+    """Recompute every summary from manager_chats (unread counts reset to zero)"""
+    await db.manager_chats.aggregate([
+        {"$sort": {"createdAt": -1}},
+        {"$project": {
+            "senderId": 1,
+            "recipientId": 1,
+            "message": 1,
+            "createdAt": 1,
+            "pair": {"$cond": [
+                {"$lt": ["$senderId", "$recipientId"]},
+                ["$senderId", "$recipientId"],
+                ["$recipientId", "$senderId"]
+            ]}
+        }},
+        {"$group": {
+            "_id": {"$concat": [{"$arrayElemAt": ["$pair", 0]}, ":", {"$arrayElemAt": ["$pair", 1]}]},
+            "user1Id": {"$first": {"$arrayElemAt": ["$pair", 0]}},
+            "user2Id": {"$first": {"$arrayElemAt": ["$pair", 1]}},
+            "participants": {"$first": "$pair"},
+            "lastMessage": {"$first": "$message"},
+            "lastSenderId": {"$first": "$senderId"},
+            "lastMessageTime": {"$first": "$createdAt"},
+            "createdAt": {"$last": "$createdAt"},
+            "messageCount": {"$sum": 1},
+            "recentMessages": {"$firstN": {"n": RECENT_MESSAGES, "input": {
+                "senderId": "$senderId",
+                "recipientId": "$recipientId",
+                "message": "$message",
+                "createdAt": "$createdAt"
+            }}}
+        }},
+        {"$set": {"unread": {}}},
+        {"$merge": {"into": "conversations", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ], allowDiskUse=True).to_list(None)
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    await rebuild_conversations(db)
+    print(f"✓ {await db.conversations.estimated_document_count()} conversations rebuilt")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+from pymongo.errors import OperationFailure
+
+from search import SERVICE_TEXT_INDEX, SERVICE_TEXT_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+# Declarative index registry: (collection, keys, options) for every query
+# shape in server.py. Applied idempotently at startup and from the CLI:
+#
+#     python indexes.py           create missing indexes
+#     python indexes.py --check   fail if a registered query shape scans
+
+INDEXES = [
+    # users
+    ("users", [("email", 1)], {"unique": True}),
+    ("users", [("userType", 1), ("banned", 1)], {}),
+
+    # services: every listing sort mode is an indexed range scan, with and
+    # without the category filter
+    ("services", [("isActive", 1), ("_id", 1)], {}),
+    ("services", [("isActive", 1), ("category", 1), ("_id", 1)], {}),
+    ("services", [("isActive", 1), ("basicPrice", 1), ("_id", 1)], {}),
+    ("services", [("isActive", 1), ("category", 1), ("basicPrice", 1), ("_id", 1)], {}),
+    ("services", [("isActive", 1), ("influencerRating", -1), ("_id", -1)], {}),
+    ("services", [("isActive", 1), ("category", 1), ("influencerRating", -1), ("_id", -1)], {}),
+    ("services", [("userId", 1), ("isActive", 1)], {}),
+    ("services", SERVICE_TEXT_INDEX, {"weights": SERVICE_TEXT_WEIGHTS}),
+
+    # orders
+    ("orders", [("orderId", 1)], {"unique": True}),
+    ("orders", [("buyerId", 1), ("createdAt", -1), ("_id", -1)], {}),
+    ("orders", [("sellerId", 1), ("createdAt", -1), ("_id", -1)], {}),
+    ("orders", [("createdAt", -1), ("_id", -1)], {}),
+    ("orders", [("status", 1)], {}),
+
+    # messages and reviews
+    ("messages", [("orderId", 1), ("createdAt", 1), ("_id", 1)], {}),
+    ("reviews", [("orderId", 1)], {"unique": True}),
+    ("reviews", [("serviceId", 1), ("createdAt", -1)], {}),
+
+    # manager chat: both directions of a conversation, plus the admin feed
+    ("manager_chats", [("senderId", 1), ("recipientId", 1), ("createdAt", 1)], {}),
+    ("manager_chats", [("recipientId", 1), ("senderId", 1), ("createdAt", 1)], {}),
+    ("manager_chats", [("createdAt", -1)], {}),
+    ("conversations", [("participants", 1), ("lastMessageTime", -1), ("_id", 1)], {}),
+    ("conversations", [("lastMessageTime", -1), ("_id", 1)], {}),
+
+    # campaigns and custom orders share the order number space
+    ("campaigns", [("orderId", 1)], {"unique": True, "sparse": True}),
+    ("campaigns", [("managerId", 1), ("createdAt", -1), ("_id", -1)], {}),
+    ("campaigns", [("createdAt", -1), ("_id", -1)], {}),
+    ("custom_orders", [("recipientId", 1), ("status", 1), ("createdAt", -1)], {}),
+    ("custom_orders", [("managerId", 1), ("status", 1)], {}),
+    ("custom_orders", [("orderId", 1)], {"unique": True, "sparse": True}),
+
+    # order id worker leases; expired ones are also claimable before removal
+    ("order_id_workers", [("expiresAt", 1)], {"expireAfterSeconds": 0}),
+
+    # categories
+    ("categories", [("id", 1)], {"unique": True}),
+    ("categories", [("order", 1)], {})
+]
+
+# Representative query shapes from server.py: (collection, filter, sort)
+_ID = "000000000000000000000000"
+QUERY_SHAPES = [
+    ("users", {"email": "user@example.com"}, None),
+    ("users", {"userType": "seller"}, None),
+    ("users", {"userType": "manager", "banned": {"$ne": True}}, None),
+    ("services", {"isActive": True}, [("_id", 1)]),
+    ("services", {"isActive": True, "category": "Video Reviews"}, [("_id", 1)]),
+    ("services", {"isActive": True}, [("basicPrice", 1), ("_id", 1)]),
+    ("services", {"isActive": True, "category": "Video Reviews"}, [("basicPrice", -1), ("_id", -1)]),
+    ("services", {"isActive": True}, [("influencerRating", -1), ("_id", -1)]),
+    ("services", {"isActive": True, "category": "Video Reviews"}, [("influencerRating", -1), ("_id", -1)]),
+    ("services", {"userId": _ID, "isActive": True}, None),
+    ("services", {"isActive": True, "$text": {"$search": "instagram"}}, None),
+    ("orders", {"orderId": "ORD-0000"}, None),
+    ("orders", {"buyerId": _ID}, [("createdAt", -1), ("_id", -1)]),
+    ("orders", {"sellerId": _ID}, [("createdAt", -1), ("_id", -1)]),
+    ("orders", {"$or": [{"buyerId": _ID}, {"sellerId": _ID}]}, [("createdAt", -1), ("_id", -1)]),
+    ("orders", {}, [("createdAt", -1), ("_id", -1)]),
+    ("orders", {"status": "in_progress"}, None),
+    ("messages", {"orderId": _ID}, [("createdAt", 1), ("_id", 1)]),
+    ("messages", {"orderId": _ID}, [("createdAt", -1), ("_id", -1)]),
+    ("reviews", {"orderId": _ID}, None),
+    ("reviews", {"serviceId": _ID}, [("createdAt", -1)]),
+    ("manager_chats", {"$or": [
+        {"senderId": _ID, "recipientId": _ID},
+        {"senderId": _ID, "recipientId": _ID}
+    ]}, [("createdAt", 1)]),
+    ("manager_chats", {"$or": [{"senderId": _ID}, {"recipientId": _ID}]}, [("createdAt", -1)]),
+    ("manager_chats", {}, [("createdAt", -1)]),
+    ("conversations", {"participants": _ID}, [("lastMessageTime", -1), ("_id", 1)]),
+    ("conversations", {}, [("lastMessageTime", -1), ("_id", 1)]),
+    ("campaigns", {"managerId": _ID}, [("createdAt", -1), ("_id", -1)]),
+    ("campaigns", {}, [("createdAt", -1)]),
+    ("custom_orders", {"recipientId": _ID, "status": {"$in": ["pending", "accepted", "rejected"]}}, [("createdAt", -1)]),
+    ("custom_orders", {"managerId": _ID, "status": "accepted"}, None),
+    ("categories", {}, [("order", 1)])
+]
+
+async def ensure_indexes(db):
+    """Create every registered index; existing ones are left as they are"""
+    for collection, keys, options in INDEXES:
+        try:
+            await db[collection].create_index(keys, **options)
+        except OperationFailure as e:
+            logger.error(f"Could not create index {keys} on {collection}: {e}")
+
+def _stages(plan: dict):
+    yield plan.get('stage')
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get('inputStages', []):
+        yield from _stages(child)
+
+async def collection_scans(db):
+    """Registered query shapes whose winning plan contains a COLLSCAN"""
+    failures = []
+    for collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        plan = explain['queryPlanner']['winningPlan']
+        if 'COLLSCAN' in set(_stages(plan)):
+            failures.append((collection, query, sort))
+    return failures
+
+async def main(check: bool):
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    await ensure_indexes(db)
+    print(f"✓ {len(INDEXES)} indexes ensured")
+
+    if check:
+        failures = await collection_scans(db)
+        for collection, query, sort in failures:
+            print(f"✗ COLLSCAN on {collection}: {query} sort={sort}")
+        if failures:
+            sys.exit(1)
+        print(f"✓ {len(QUERY_SHAPES)} query shapes use an index")
+
+if __name__ == "__main__":
+    asyncio.run(main('--check' in sys.argv))
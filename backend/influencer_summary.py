@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateMany
+
+from projections import USER_CARD_FIELDS
+
+# Compact influencer card embedded in every service as influencerSummary,
+# so catalog reads need no users join. Writes that change a card field
+# (profile edits, ratings, bans) fan out with one update_many per user.
+#
+#     python influencer_summary.py            report drifted services
+#     python influencer_summary.py --repair   report and rewrite them
+
+SUMMARY_FIELDS = USER_CARD_FIELDS + ["banned"]
+SUMMARY_PROJECTION = {field: 1 for field in SUMMARY_FIELDS}
+BATCH_SIZE = 500
+
+def summarize(user: dict) -> dict:
+    summary = {"_id": str(user['_id'])}
+    for field in SUMMARY_FIELDS:
+        summary[field] = user.get(field)
+    summary['banned'] = bool(summary['banned'])
+    return summary
+
+async def load_summary(db, user_id: str) -> Optional[dict]:
+    if not ObjectId.is_valid(user_id):
+        return None
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, SUMMARY_PROJECTION)
+    return summarize(user) if user else None
+
+async def fan_out(db, user_id: str) -> int:
+    """Rewrite influencerSummary on every service of the user"""
+    summary = await load_summary(db, user_id)
+    if summary is None:
+        return 0
+    result = await db.services.update_many(
+        {"userId": user_id},
+        {"$set": {"influencerSummary": summary}}
+    )
+    return result.modified_count
+
+async def find_drift(db) -> List[str]:
+    """Ids of users whose services carry a missing or stale summary"""
+    drifted = set()
+    batch = []
+
+    async def check(services):
+        owner_ids = {s['userId'] for s in services if ObjectId.is_valid(s.get('userId') or '')}
+        users = await db.users.find(
+            {"_id": {"$in": [ObjectId(i) for i in owner_ids]}}, SUMMARY_PROJECTION
+        ).to_list(len(owner_ids))
+        expected = {str(u['_id']): summarize(u) for u in users}
+        for service in services:
+            owner_id = service.get('userId')
+            if owner_id in expected and service.get('influencerSummary') != expected[owner_id]:
+                drifted.add(owner_id)
+
+    async for service in db.services.find({}, {"userId": 1, "influencerSummary": 1}):
+        batch.append(service)
+        if len(batch) == BATCH_SIZE:
+            await check(batch)
+            batch = []
+    if batch:
+        await check(batch)
+    return sorted(drifted)
+
+async def repair(db, user_ids: List[str]) -> int:
+    modified = 0
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        chunk = user_ids[start:start + BATCH_SIZE]
+        users = await db.users.find(
+            {"_id": {"$in": [ObjectId(i) for i in chunk]}}, SUMMARY_PROJECTION
+        ).to_list(len(chunk))
+        ops = [
+            UpdateMany({"userId": str(u['_id'])}, {"$set": {"influencerSummary": summarize(u)}})
+            for u in users
+        ]
+        if ops:
+            result = await db.services.bulk_write(ops, ordered=False)
+            modified += result.modified_count
+    return modified
+
+async def main(fix: bool):
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    drifted = await find_drift(db)
+    print(f"{'✗' if drifted else '✓'} {len(drifted)} influencers with drifted service summaries")
+    if drifted and fix:
+        modified = await repair(db, drifted)
+        print(f"✓ {modified} services repaired")
+    elif drifted:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main('--repair' in sys.argv))
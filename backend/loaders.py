@@ -0,0 +1,111 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from bson import ObjectId
+
+from projections import apply_projection
+
+# Request-scoped batching: every load() issued in the same event-loop tick is
+# collected and resolved by one batch call, and results are memoized for the
+# rest of the request.
+
+class DataLoader:
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Optional[dict]]]]):
+        self.batch_fn = batch_fn
+        self.batches = 0
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+
+    def load(self, key: Hashable) -> "asyncio.Future":
+        future = self._cache.get(key)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._cache[key] = future
+        if not self._queue:
+            loop.call_soon(lambda: asyncio.ensure_future(self._dispatch()))
+        self._queue.append(key)
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[dict]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Hashable, value: Optional[dict]):
+        if key not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._cache[key] = future
+
+    async def _dispatch(self):
+        keys, self._queue = self._queue, []
+        self.batches += 1
+        try:
+            results = await self.batch_fn(keys)
+        except Exception as exc:
+            for key in keys:
+                self._cache.pop(key, None).set_exception(exc)
+            return
+        for key in keys:
+            self._cache[key].set_result(results.get(key))
+
+def by_id_batch(collection, projection: Optional[dict] = None):
+    """Batch function loading documents by string id with a single $in query"""
+    async def batch(keys):
+        object_ids = [ObjectId(key) for key in keys if key and ObjectId.is_valid(key)]
+        if not object_ids:
+            return {}
+        docs = await collection.find({"_id": {"$in": object_ids}}, projection).to_list(len(object_ids))
+        return {str(doc['_id']): doc for doc in docs}
+    return batch
+
+def projected_batch(source, projection: Optional[dict] = None):
+    """Batch function over a shared source (e.g. a cache), projected in memory"""
+    async def batch(keys):
+        docs = await source(keys)
+        return {key: apply_projection(doc, projection) for key, doc in docs.items()}
+    return batch
+
+def _covers(fields: Iterable[str], projection: Optional[dict]) -> bool:
+    """Whether documents holding only fields can satisfy projection"""
+    if projection is None:
+        return True
+    if any(value == 0 for value in projection.values()):
+        return False
+    fields = set(fields)
+    return all(path.split('.')[0] in fields or path == '_id' for path in projection)
+
+class Loaders:
+    """Per-request by-id loaders, one per (collection, projection) pair.
+
+    Users come from user_source when given, so user lookups in a request go
+    through the process-wide profile cache. The source holds only
+    user_source_fields; loaders asking for anything else read from the
+    database.
+    """
+
+    def __init__(self, db, user_source=None, user_source_fields: Iterable[str] = ()):
+        self.db = db
+        self.user_source = user_source
+        self.user_source_fields = list(user_source_fields)
+        self._loaders: Dict[tuple, DataLoader] = {}
+
+    def loader(self, collection: str, projection: Optional[dict] = None) -> DataLoader:
+        key = (collection, repr(sorted((projection or {}).items())))
+        if key not in self._loaders:
+            if (collection == "users" and self.user_source is not None
+                    and _covers(self.user_source_fields, projection)):
+                batch = projected_batch(self.user_source, projection)
+            else:
+                batch = by_id_batch(self.db[collection], projection)
+            self._loaders[key] = DataLoader(batch)
+        return self._loaders[key]
+
+    @property
+    def users(self) -> DataLoader:
+        return self.loader("users")
+
+    @property
+    def services(self) -> DataLoader:
+        return self.loader("services")
@@ -0,0 +1,70 @@
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from order_snapshot import service_snapshot, custom_order_snapshot
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+mongo_url = os.environ['MONGO_URL']
+client = AsyncIOMotorClient(mongo_url)
+db = client[os.environ['DB_NAME']]
+
+BATCH_SIZE = 500
+
+async def load_by_id(collection, ids):
+    object_ids = [ObjectId(i) for i in set(ids) if i and ObjectId.is_valid(i)]
+    docs = await collection.find({"_id": {"$in": object_ids}}).to_list(len(object_ids))
+    return {str(doc['_id']): doc for doc in docs}
+
+async def snapshot_batch(orders):
+    services = await load_by_id(db.services, [o.get('serviceId') for o in orders])
+    custom_orders = await load_by_id(db.custom_orders, [o.get('customOrderId') for o in orders])
+    sellers = await load_by_id(db.users, [o.get('sellerId') for o in orders])
+
+    ops = []
+    for order in orders:
+        seller = sellers.get(order.get('sellerId'))
+        service = services.get(order.get('serviceId'))
+        custom_order = custom_orders.get(order.get('customOrderId'))
+        if service and order.get('package') in service.get('packages', {}):
+            snapshot = service_snapshot(service, order['package'], seller)
+        elif custom_order:
+            snapshot = custom_order_snapshot(custom_order, order.get('sellerId'), seller)
+        else:
+            continue
+        ops.append(UpdateOne(
+            {"_id": order['_id'], "serviceSnapshot": {"$exists": False}},
+            {"$set": {"serviceSnapshot": snapshot}}
+        ))
+    if ops:
+        result = await db.orders.bulk_write(ops, ordered=False)
+        return result.modified_count
+    return 0
+
+async def migrate_order_snapshots():
+    print("Backfilling order service snapshots...")
+
+    # Snapshots taken now reflect current service data, the closest we have
+    # to what was bought
+    updated = 0
+    batch = []
+    async for order in db.orders.find(
+        {"serviceSnapshot": {"$exists": False}},
+        {"serviceId": 1, "customOrderId": 1, "sellerId": 1, "package": 1}
+    ):
+        batch.append(order)
+        if len(batch) == BATCH_SIZE:
+            updated += await snapshot_batch(batch)
+            batch = []
+    if batch:
+        updated += await snapshot_batch(batch)
+    print(f"✓ serviceSnapshot set on {updated} orders")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_order_snapshots())
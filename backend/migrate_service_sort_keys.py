@@ -0,0 +1,43 @@
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+from bson import ObjectId
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+mongo_url = os.environ['MONGO_URL']
+client = AsyncIOMotorClient(mongo_url)
+db = client[os.environ['DB_NAME']]
+
+async def migrate_service_sort_keys():
+    print("Backfilling service sort keys...")
+    
+    # basicPrice mirrors server.basic_price: the basic package price, else
+    # the cheapest package, else 0 -- never null
+    cheapest = {"$min": {"$map": {
+        "input": {"$objectToArray": {"$ifNull": ["$packages", {}]}},
+        "in": "$$this.v.price"
+    }}}
+    result = await db.services.update_many(
+        {},
+        [{"$set": {"basicPrice": {"$ifNull": ["$packages.basic.price", cheapest, 0]}}}]
+    )
+    print(f"✓ basicPrice set on {result.modified_count} services")
+    
+    # influencerRating is copied from each owner
+    owner_ids = await db.services.distinct("userId")
+    owner_ids = [ObjectId(uid) for uid in owner_ids if uid and ObjectId.is_valid(uid)]
+    updated = 0
+    async for user in db.users.find({"_id": {"$in": owner_ids}}, {"rating": 1}):
+        result = await db.services.update_many(
+            {"userId": str(user['_id'])},
+            {"$set": {"influencerRating": user.get('rating', 0.0)}}
+        )
+        updated += result.modified_count
+    print(f"✓ influencerRating set on {updated} services")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_service_sort_keys())
@@ -171,7 +171,7 @@ class MessageInDB(BaseModel):
 class ReviewCreate(BaseModel):
     serviceId: str
     orderId: str
-    rating: int  # 1-5
+    rating: int = Field(ge=1, le=5)
     comment: str
 
 class ReviewInDB(BaseModel):
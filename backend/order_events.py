@@ -0,0 +1,104 @@
+import json
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
+
+from realtime import Hub
+
+# Order status feed for Server-Sent Events. Every order transition is
+# given an id "<epoch>-<seq>", kept in a bounded replay buffer and pushed
+# through the realtime hub to the buyer and the seller. A reconnecting
+# client sends Last-Event-ID and gets what it missed from the buffer; if
+# the id is from another process or has aged out, it is told to reset and
+# reload /orders instead.
+#
+# Each worker has its own feed. Events published on one worker reach the
+# others through the cache bus (encode_event/relay), where they get local
+# ids, so every worker's stream and replay buffer see every transition.
+# They keep the id the publishing worker gave them as originId; a relay
+# of an originId already seen (the bus replays after a reconnect) is
+# dropped, so each transition is streamed once per worker.
+
+# Origin ids remembered for relay de-duplication
+RELAYED_IDS = 10000
+
+def feed_topic(user_id: str) -> str:
+    return f"orders:{user_id}"
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def format_sse(event: dict) -> str:
+    payload = {key: value for key, value in event.items() if key not in ('id', 'originId', 'users')}
+    data = json.dumps(payload, default=_json_default)
+    return f"id: {event['id']}\nevent: order\ndata: {data}\n\n"
+
+def encode_event(event: dict) -> str:
+    """An event as sent to other workers; they assign their own ids and keep originId"""
+    return json.dumps({key: value for key, value in event.items() if key != 'id'}, default=_json_default)
+
+class OrderFeed:
+    def __init__(self, hub: Hub, size: int = 1000):
+        self.hub = hub
+        self.buffer = deque(maxlen=size)
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self._relayed = set()
+        self._relayed_order = deque()
+
+    def publish(self, order: dict, action: str) -> dict:
+        users = [user for user in {order.get('buyerId'), order.get('sellerId')} if user]
+        return self._append({
+            "action": action,
+            "orderId": str(order['_id']),
+            "orderNumber": order.get('orderId'),
+            "status": order.get('status'),
+            "paymentStatus": order.get('paymentStatus'),
+            "updatedAt": order.get('updatedAt') or datetime.utcnow(),
+            "users": users
+        })
+
+    def relay(self, payload: Optional[str]):
+        """Add an event published by another worker (see encode_event)"""
+        if not payload:
+            return
+        event = json.loads(payload)
+        origin_id = event.get('originId')
+        if origin_id:
+            if origin_id in self._relayed:
+                return
+            self._relayed.add(origin_id)
+            self._relayed_order.append(origin_id)
+            if len(self._relayed_order) > RELAYED_IDS:
+                self._relayed.discard(self._relayed_order.popleft())
+        self._append(event)
+
+    def _append(self, event: dict) -> dict:
+        self.seq += 1
+        event_id = f"{self.epoch}-{self.seq}"
+        event = {"id": event_id, "originId": event.get('originId', event_id), **event}
+        self.buffer.append(event)
+        for user_id in event['users']:
+            self.hub.publish(feed_topic(user_id), {"event": event})
+        return event
+
+    def sequence(self, event_id: Optional[str]) -> Optional[int]:
+        """Sequence number of an id issued by this feed, else None"""
+        epoch, _, seq = (event_id or "").partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def replay(self, user_id: str, last_event_id: str) -> Optional[List[dict]]:
+        """Events for user_id after last_event_id, or None if they can't be replayed"""
+        seq = self.sequence(last_event_id)
+        if seq is None or seq > self.seq:
+            return None
+        oldest = self.seq - len(self.buffer) + 1
+        if seq + 1 < oldest:
+            return None
+        return [
+            event for event in self.buffer
+            if self.sequence(event['id']) > seq and user_id in event['users']
+        ]
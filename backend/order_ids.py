@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Snowflake-style order numbers: 41 bits of milliseconds since EPOCH_MS,
+# 10 bits of worker id and 12 bits of per-millisecond sequence, encoded as
+# fixed-width Crockford base32 so string order matches creation order.
+# Each process leases a worker id at startup and keeps it with a heartbeat,
+# so generating an id never touches the database. A lease document per
+# worker id records its owner and expiry; a crashed process's id frees up
+# once its lease expires.
+
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+PREFIX = "ORD-"
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_WIDTH = 13  # 13 * 5 bits >= 63 bits
+
+LEASE_TTL_SECONDS = 60
+LEASE_COLLECTION = "order_id_workers"
+
+def encode(value: int) -> str:
+    chars = []
+    for _ in range(_WIDTH):
+        value, digit = divmod(value, 32)
+        chars.append(_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+def decode(order_id: str) -> int:
+    value = 0
+    for char in order_id[len(PREFIX):] if order_id.startswith(PREFIX) else order_id:
+        value = value * 32 + _ALPHABET.index(char)
+    return value
+
+def created_at_ms(order_id: str) -> int:
+    """Creation time (unix ms) embedded in an order id"""
+    return (decode(order_id) >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS
+
+class OrderIdGenerator:
+    def __init__(self, worker_id: Optional[int] = None):
+        self.worker_id = worker_id if worker_id is not None else random.randint(0, MAX_WORKER)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._leases = None
+        self._ttl = LEASE_TTL_SECONDS
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    async def lease_worker_id(self, db, collection: str = LEASE_COLLECTION, ttl: float = LEASE_TTL_SECONDS):
+        """Claim a worker id no live process holds, and renew it every ttl/3"""
+        self._leases = db[collection]
+        self._ttl = ttl
+        await self._claim()
+        self._heartbeat = asyncio.ensure_future(self._renew_forever())
+
+    async def release(self):
+        """Stop the heartbeat and free the worker id for other processes"""
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        if self._leases is not None:
+            await self._leases.delete_one({"_id": self.worker_id, "owner": self.owner})
+
+    async def _claim(self):
+        now = datetime.utcnow()
+        live = set()
+        async for doc in self._leases.find({"expiresAt": {"$gt": now}}, {"_id": 1}):
+            live.add(doc['_id'])
+        free = [worker_id for worker_id in range(MAX_WORKER + 1) if worker_id not in live]
+        random.shuffle(free)
+        for worker_id in free:
+            try:
+                # Matches a missing or expired lease; a live one makes the
+                # upsert collide on _id
+                await self._leases.update_one(
+                    {"_id": worker_id, "expiresAt": {"$lte": now}},
+                    {"$set": {"owner": self.owner, "expiresAt": now + timedelta(seconds=self._ttl)}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                continue
+            with self._lock:
+                self.worker_id = worker_id
+            logger.info(f"Order id worker id {worker_id}")
+            return
+        raise RuntimeError("No free order id worker id; all leases are held")
+
+    async def _renew(self):
+        result = await self._leases.update_one(
+            {"_id": self.worker_id, "owner": self.owner},
+            {"$set": {"expiresAt": datetime.utcnow() + timedelta(seconds=self._ttl)}}
+        )
+        if result.matched_count == 0:
+            # Missed heartbeats long enough for the lease to lapse and be
+            # taken; move to a fresh id rather than share this one
+            logger.warning(f"Lost the lease on order id worker id {self.worker_id}, claiming a new one")
+            await self._claim()
+
+    async def _renew_forever(self):
+        while True:
+            await asyncio.sleep(self._ttl / 3)
+            try:
+                await self._renew()
+            except asyncio.CancelledError:
+                raise
+            except (PyMongoError, RuntimeError):
+                logger.exception("Could not renew the order id worker lease")
+
+    def next_int(self) -> int:
+        with self._lock:
+            now = int(time.time() * 1000) - EPOCH_MS
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                # Same millisecond or clock stepped back: keep counting from the
+                # last issued timestamp, borrowing the next millisecond when the
+                # sequence runs out, so ids stay unique and increasing
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+            return (self._last_ms << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def __call__(self) -> str:
+        return PREFIX + encode(self.next_int())
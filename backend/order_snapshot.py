@@ -0,0 +1,53 @@
+from typing import Optional
+
+from projections import USER_CARD_FIELDS
+
+# Immutable copy of what was bought, stored on the order as serviceSnapshot
+# at purchase time. It is shaped like the service object order views
+# render (title, image, the purchased package and the seller card), so
+# reads need no services or users join and later edits to the service
+# don't rewrite order history.
+
+def seller_card(user: Optional[dict]) -> Optional[dict]:
+    if not user:
+        return None
+    card = {"_id": str(user['_id'])}
+    for field in USER_CARD_FIELDS:
+        if field in user:
+            card[field] = user[field]
+    return card
+
+def service_snapshot(service: dict, package_key: str, seller: Optional[dict]) -> dict:
+    package = service['packages'][package_key]
+    return {
+        "_id": str(service['_id']),
+        "userId": service.get('userId'),
+        "title": service.get('title'),
+        "image": service.get('image'),
+        "category": service.get('category'),
+        "package": {
+            "key": package_key,
+            "name": package.get('name'),
+            "price": package.get('price'),
+            "delivery": package.get('delivery'),
+            "features": list(package.get('features', []))
+        },
+        "influencer": seller_card(seller)
+    }
+
+def custom_order_snapshot(custom_order: dict, seller_id: str, seller: Optional[dict]) -> dict:
+    return {
+        "_id": None,
+        "userId": seller_id,
+        "title": custom_order.get('title'),
+        "image": None,
+        "category": None,
+        "package": {
+            "key": "custom",
+            "name": "Custom",
+            "price": custom_order.get('price'),
+            "delivery": custom_order.get('deliveryDays'),
+            "features": []
+        },
+        "influencer": seller_card(seller)
+    }
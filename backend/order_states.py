@@ -0,0 +1,106 @@
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+# Order state machine. Each transition is a single conditional
+# find_one_and_update whose filter carries the actor and source-state
+# predicates, so concurrent requests cannot both pass a check:
+#
+#   pending ──→ in_progress ──→ delivered ──→ completed
+#      │             │  ↑            │
+#      │             │  └─ revision ─┘
+#      └──── cancel ─┘
+
+class Transition(NamedTuple):
+    actor: str                  # order field holding the only user allowed to run it
+    sources: Tuple[str, ...]    # states it may start from
+    target: str
+    denied: str                 # 403 detail when someone else tries
+    guard: Optional[dict] = None
+    guard_failed: str = ""      # 400 detail when the guard does not hold
+    update: Optional[dict] = None
+    inc: Optional[dict] = None
+
+TRANSITIONS = {
+    "start": Transition(
+        actor="sellerId", sources=("pending",), target="in_progress",
+        denied="Only seller can start"
+    ),
+    "deliver": Transition(
+        actor="sellerId", sources=("in_progress",), target="delivered",
+        denied="Only seller can deliver"
+    ),
+    "accept": Transition(
+        actor="buyerId", sources=("delivered",), target="completed",
+        denied="Only buyer can accept",
+        update={"paymentStatus": "released"}
+    ),
+    "revision": Transition(
+        actor="buyerId", sources=("delivered",), target="in_progress",
+        denied="Only buyer can request revision",
+        guard={"$expr": {"$lt": ["$revisions", "$maxRevisions"]}},
+        guard_failed="No revisions left",
+        inc={"revisions": 1}
+    ),
+    "cancel": Transition(
+        actor="buyerId", sources=("pending", "in_progress"), target="cancelled",
+        denied="Only buyer can cancel",
+        update={"paymentStatus": "refunded"}
+    )
+}
+
+async def transition_order(
+    orders,
+    order_id: str,
+    name: str,
+    user_id: str,
+    fields: Optional[dict] = None
+) -> dict:
+    """Run a transition in one round trip and return the updated order.
+
+    fields are extra $set values (e.g. the delivery note). When the
+    conditional update matches nothing, the order is read once to report
+    why: 404, 403 for the wrong actor, 400 for the wrong state or guard.
+    """
+    if not ObjectId.is_valid(order_id):
+        raise HTTPException(status_code=400, detail="Invalid order ID")
+    transition = TRANSITIONS[name]
+    now = datetime.utcnow()
+
+    query = {
+        "_id": ObjectId(order_id),
+        transition.actor: user_id,
+        "status": {"$in": list(transition.sources)},
+        **(transition.guard or {})
+    }
+    update = {
+        "$set": {
+            "status": transition.target,
+            "updatedAt": now,
+            **(transition.update or {}),
+            **(fields or {})
+        }
+    }
+    if transition.target == "completed":
+        update["$set"]["completedAt"] = now
+    if transition.inc:
+        update["$inc"] = transition.inc
+
+    order = await orders.find_one_and_update(query, update, return_document=ReturnDocument.AFTER)
+    if order is not None:
+        return order
+
+    current = await orders.find_one(
+        {"_id": ObjectId(order_id)},
+        {transition.actor: 1, "status": 1, "revisions": 1, "maxRevisions": 1}
+    )
+    if current is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if current.get(transition.actor) != user_id:
+        raise HTTPException(status_code=403, detail=transition.denied)
+    if current.get('status') not in transition.sources:
+        raise HTTPException(status_code=400, detail=f"Cannot {name} an order that is {current.get('status')}")
+    raise HTTPException(status_code=400, detail=transition.guard_failed or "Order changed, try again")
@@ -0,0 +1,76 @@
+import base64
+from typing import List, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException
+
+# Keyset pagination: a cursor is the sort-key values of the last document
+# on a page, so the next page is an indexed range scan instead of a skip.
+
+def _field_value(doc: dict, path: str):
+    value = doc
+    for part in path.split('.'):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+def encode_cursor(doc: dict, sort: List[Tuple[str, int]]) -> str:
+    values = [_field_value(doc, field) for field, _ in sort]
+    raw = json_util.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token: str, sort: List[Tuple[str, int]]) -> list:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def decode_offset(token: str) -> int:
+    """Offset carried by an offset cursor (see encode_offset)"""
+    offset = decode_cursor(token, [("offset", 1)])[0]
+    if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+def encode_offset(offset: int) -> str:
+    return encode_cursor({"offset": offset}, [("offset", 1)])
+
+def keyset_query(query: dict, sort: List[Tuple[str, int]], cursor: Optional[str]) -> dict:
+    """Restrict query to documents strictly after the cursor in sort order"""
+    if not cursor:
+        return query
+
+    values = decode_cursor(cursor, sort)
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        value = values[i]
+        if value is None:
+            # null sorts first: every non-null value comes after it when
+            # ascending, nothing does when descending
+            if direction != 1:
+                continue
+            condition = {"$ne": None}
+        else:
+            condition = {"$gt" if direction == 1 else "$lt": value}
+        clause = {f: v for (f, _), v in zip(sort[:i], values[:i])}
+        clause[field] = condition
+        clauses.append(clause)
+
+    # $or needs at least one clause; no clause means nothing is left
+    keyset = {"$or": clauses} if clauses else {"_id": {"$in": []}}
+    return {"$and": [query, keyset]} if query else keyset
+
+async def fetch_page(collection, query: dict, sort, limit: int, cursor: Optional[str] = None, projection=None):
+    """Return one page of documents and the cursor for the next one"""
+    docs = await collection.find(keyset_query(query, sort, cursor), projection).sort(sort).limit(limit).to_list(limit)
+    next_cursor = encode_cursor(docs[-1], sort) if len(docs) == limit else None
+    return docs, next_cursor
+
+def page_response(items: list, next_cursor: Optional[str], cursor: Optional[str]):
+    """Plain list for legacy callers; envelope once a client passes cursor"""
+    if cursor is None:
+        return items
+    return {"items": items, "nextCursor": next_cursor}
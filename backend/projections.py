@@ -0,0 +1,140 @@
+import re
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+# Projections for read endpoints. password is excluded by every projection
+# here and can never be requested through fields=.
+
+USER_PUBLIC_PROJECTION = {"password": 0}
+
+# Influencer/user card shown inside listings
+USER_CARD_FIELDS = [
+    "name", "username", "avatar", "level", "rating", "reviewCount",
+    "platform", "followers", "userType"
+]
+USER_CARD_PROJECTION = {field: 1 for field in USER_CARD_FIELDS}
+
+# Card plus email, for the admin and manager views that show contact details
+USER_CONTACT_PROJECTION = {**USER_CARD_PROJECTION, "email": 1}
+
+USER_LIST_PROJECTION = {"password": 0, "bio": 0, "socialPlatforms": 0}
+
+# Service card shown in listings. Images may be large base64 data URIs, so
+# listings get the URL of GET /services/{id}/image in their place; plain
+# image URLs pass through unchanged.
+SERVICE_IMAGE_URL = {"$cond": [
+    {"$eq": [{"$substrBytes": [{"$ifNull": ["$image", ""]}, 0, 5]}, "data:"]},
+    {"$concat": ["/api/services/", {"$toString": "$_id"}, "/image"]},
+    "$image"
+]}
+SERVICE_LIST_PROJECTION = {
+    "userId": 1, "title": 1, "description": 1, "category": 1, "isActive": 1,
+    "packages.basic": 1, "basicPrice": 1, "rating": 1, "reviewCount": 1,
+    "influencerRating": 1, "createdAt": 1, "image": SERVICE_IMAGE_URL
+}
+
+# Order list rows: the snapshot image is replaced by the service image URL
+ORDER_LIST_PROJECTION = {"serviceSnapshot.image": 0}
+
+def service_image_url(service_id: str) -> str:
+    return f"/api/services/{service_id}/image"
+
+MAX_FIELDS = 50
+_FIELD_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$")
+_PRIVATE_FIELDS = {"password"}
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validated field names from a comma-separated fields= value"""
+    if fields is None:
+        return None
+    names = []
+    for name in fields.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if not _FIELD_RE.match(name):
+            raise HTTPException(status_code=400, detail=f"Invalid field: {name}")
+        # Private at any depth: influencer.password must not reach a join
+        if _PRIVATE_FIELDS.intersection(name.split('.')) or name in names:
+            continue
+        names.append(name)
+    if len(names) > MAX_FIELDS:
+        raise HTTPException(status_code=400, detail="Too many fields requested")
+    return names
+
+def field_projection(
+    names: Optional[List[str]],
+    default: Optional[dict],
+    required: Iterable[str] = (),
+    joins: Iterable[str] = ()
+) -> Optional[dict]:
+    """Inclusion projection for the requested names, or default if none apply.
+
+    Names under a joined document's key (e.g. influencer.name) are left to
+    join_fields; required fields (join keys, sort keys) are always included.
+    A path whose parent is also selected is dropped, since Mongo rejects
+    projections with colliding paths and the parent already includes it.
+    """
+    joins = set(joins)
+    own = [name for name in names or [] if name.split('.')[0] not in joins]
+    if own:
+        paths = dict.fromkeys(own, 1)
+    elif not default or _is_exclusion(default):
+        return default
+    else:
+        # An inclusion default still needs the required fields
+        paths = dict(default)
+    for name in required:
+        paths.setdefault(name, 1)
+    return {path: value for path, value in paths.items() if not _has_selected_parent(path, paths)}
+
+def _is_exclusion(projection: dict) -> bool:
+    return any(value == 0 for key, value in projection.items() if key != '_id')
+
+def _has_selected_parent(path: str, paths) -> bool:
+    parts = path.split('.')
+    return any('.'.join(parts[:i]) in paths for i in range(1, len(parts)))
+
+def join_fields(
+    names: Optional[List[str]],
+    join: str,
+    allowed: Optional[Iterable[str]] = None
+) -> Tuple[bool, Optional[List[str]]]:
+    """Whether to load a joined document, and which of its fields were asked for.
+
+    Without fields= the join uses its default projection. With fields= it is
+    skipped unless named, either bare (default projection) or as join.field.
+    When allowed is given, join.field names outside it are ignored.
+    """
+    if names is None:
+        return True, None
+    prefix = join + '.'
+    sub = [name[len(prefix):] for name in names if name.startswith(prefix)]
+    if allowed is not None:
+        allowed = set(allowed)
+        sub = [name for name in sub if name.split('.')[0] in allowed]
+    if sub:
+        return True, sub
+    return join in names, None
+
+def apply_projection(doc: Optional[dict], projection: Optional[dict]) -> Optional[dict]:
+    """Apply a simple inclusion/exclusion projection to an in-memory document"""
+    if doc is None or not projection:
+        return doc
+    if _is_exclusion(projection):
+        return {key: value for key, value in doc.items() if projection.get(key, 1) != 0}
+
+    result = {"_id": doc["_id"]} if "_id" in doc else {}
+    for path in projection:
+        parts = path.split('.')
+        source, target = doc, result
+        for part in parts[:-1]:
+            source = source.get(part) if isinstance(source, dict) else None
+            if not isinstance(source, dict):
+                break
+            target = target.setdefault(part, {})
+        else:
+            if parts[-1] in source:
+                target[parts[-1]] = source[parts[-1]]
+    return result
@@ -0,0 +1,161 @@
+import asyncio
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
+
+# Running rating aggregates kept on services and on their sellers:
+# ratingSum, ratingCount, ratingHistogram (per star) and the derived
+# rating/reviewCount the UI reads. A new review is one atomic pipeline
+# update per document; recompute_ratings rebuilds everything from the
+# reviews collection as a repair job.
+
+STARS = (1, 2, 3, 4, 5)
+
+def _add_rating(stars: int, legacy_sum, legacy_count, legacy_histogram: Optional[Dict[int, int]] = None) -> list:
+    """Pipeline update folding one review into the running aggregates.
+
+    The legacy values seed documents that have no aggregates yet.
+    """
+    histogram = {}
+    for star in (STARS if legacy_histogram is not None else (stars,)):
+        seed = (legacy_histogram or {}).get(star, 0)
+        histogram[f"ratingHistogram.{star}"] = {"$add": [
+            {"$ifNull": [f"$ratingHistogram.{star}", seed]}, 1 if star == stars else 0
+        ]}
+    return [
+        {"$set": {
+            "ratingSum": {"$add": [{"$ifNull": ["$ratingSum", legacy_sum]}, stars]},
+            "ratingCount": {"$add": [{"$ifNull": ["$ratingCount", legacy_count]}, 1]},
+            **histogram
+        }},
+        {"$set": {
+            "rating": {"$round": [{"$divide": ["$ratingSum", "$ratingCount"]}, 1]},
+            "reviewCount": "$ratingCount"
+        }}
+    ]
+
+async def _review_histogram(db, service_id: str, exclude_id) -> Dict[int, int]:
+    histogram: Dict[int, int] = defaultdict(int)
+    async for row in db.reviews.aggregate([
+        {"$match": {"serviceId": service_id, "_id": {"$ne": exclude_id}}},
+        {"$group": {"_id": "$rating", "count": {"$sum": 1}}}
+    ]):
+        histogram[row['_id']] += row['count']
+    return histogram
+
+async def add_review_rating(db, service_id: str, stars: int, review_id=None):
+    """Fold a new review into its service and seller; returns the seller's updated doc"""
+    existing = await db.services.find_one({"_id": ObjectId(service_id)}, {"ratingCount": 1})
+    if not existing:
+        return None
+
+    # Services reviewed before these aggregates existed start from their
+    # other reviews; the new one is folded in by the update itself
+    legacy = None
+    if 'ratingCount' not in existing:
+        legacy = await _review_histogram(db, service_id, review_id)
+    service = await db.services.find_one_and_update(
+        {"_id": ObjectId(service_id)},
+        _add_rating(
+            stars,
+            sum(star * n for star, n in (legacy or {}).items()),
+            sum((legacy or {}).values()),
+            legacy
+        ),
+        projection={"userId": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not service:
+        return None
+
+    # Sellers created before these aggregates existed start from their
+    # stored rating and reviewCount
+    seller = await db.users.find_one_and_update(
+        {"_id": ObjectId(service['userId'])},
+        _add_rating(
+            stars,
+            {"$multiply": [{"$ifNull": ["$rating", 0]}, {"$ifNull": ["$reviewCount", 0]}]},
+            {"$ifNull": ["$reviewCount", 0]}
+        ),
+        projection={"rating": 1, "reviewCount": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if seller:
+        # Keep the denormalized sort key and influencer card in step
+        await db.services.update_many(
+            {"userId": service['userId']},
+            {"$set": {
+                "influencerRating": seller['rating'],
+                "influencerSummary.rating": seller['rating'],
+                "influencerSummary.reviewCount": seller['reviewCount']
+            }}
+        )
+    return seller
+
+def _aggregates(histogram: Dict[int, int]) -> dict:
+    count = sum(histogram.values())
+    total = sum(stars * n for stars, n in histogram.items())
+    return {
+        "ratingSum": total,
+        "ratingCount": count,
+        "ratingHistogram": {str(stars): histogram.get(stars, 0) for stars in STARS},
+        "rating": round(total / count, 1) if count else 0.0,
+        "reviewCount": count
+    }
+
+async def recompute_ratings(db) -> List[str]:
+    """Rebuild every service and seller aggregate from reviews; returns seller ids touched"""
+    per_service: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    async for row in db.reviews.aggregate([
+        {"$group": {"_id": {"serviceId": "$serviceId", "rating": "$rating"}, "count": {"$sum": 1}}}
+    ], allowDiskUse=True):
+        per_service[row['_id']['serviceId']][row['_id']['rating']] += row['count']
+
+    per_seller: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    service_ops = []
+    async for service in db.services.find({}, {"userId": 1}):
+        histogram = per_service.get(str(service['_id']), {})
+        seller_histogram = per_seller[service.get('userId')]
+        for stars, n in histogram.items():
+            seller_histogram[stars] += n
+        service_ops.append(UpdateOne({"_id": service['_id']}, {"$set": _aggregates(histogram)}))
+    if service_ops:
+        await db.services.bulk_write(service_ops, ordered=False)
+
+    user_ops = []
+    service_key_ops = []
+    for seller_id, histogram in per_seller.items():
+        if not seller_id or not ObjectId.is_valid(seller_id):
+            continue
+        aggregates = _aggregates(histogram)
+        user_ops.append(UpdateOne({"_id": ObjectId(seller_id)}, {"$set": aggregates}))
+        service_key_ops.append(UpdateMany(
+            {"userId": seller_id},
+            {"$set": {
+                "influencerRating": aggregates['rating'],
+                "influencerSummary.rating": aggregates['rating'],
+                "influencerSummary.reviewCount": aggregates['reviewCount']
+            }}
+        ))
+    if user_ops:
+        await db.users.bulk_write(user_ops, ordered=False)
+        await db.services.bulk_write(service_key_ops, ordered=False)
+    return [seller_id for seller_id in per_seller if seller_id and ObjectId.is_valid(seller_id)]
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    sellers = await recompute_ratings(db)
+    print(f"✓ Ratings recomputed for {len(sellers)} sellers")
+
+if __name__ == "__main__":
+    asyncio.run(main())
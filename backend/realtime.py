@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# In-process pub/sub for WebSocket push. Each connection owns a bounded
+# queue; publish never waits on a client. Delivery is at-most-once: when a
+# subscriber's queue is full the event is dropped for that subscriber, and
+# a subscriber that keeps falling behind is disconnected so it can reload
+# and resubscribe. Hubs are per worker process.
+
+class Subscriber:
+    __slots__ = ("user_id", "queue", "topics", "dropped", "closed")
+
+    def __init__(self, user_id: str, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.topics: Set[str] = set()
+        self.dropped = 0
+        self.closed = False
+
+class Hub:
+    def __init__(self, queue_size: int = 100, max_dropped: int = 100, max_topics: int = 200):
+        self.queue_size = queue_size
+        self.max_dropped = max_dropped
+        self.max_topics = max_topics
+        self._topics: Dict[str, Set[Subscriber]] = defaultdict(set)
+        self.connections = 0
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def connect(self, user_id: str) -> Subscriber:
+        self.connections += 1
+        return Subscriber(user_id, self.queue_size)
+
+    def disconnect(self, subscriber: Subscriber):
+        for topic in subscriber.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._topics[topic]
+        subscriber.topics.clear()
+        if not subscriber.closed:
+            subscriber.closed = True
+            self.connections -= 1
+
+    def subscribe(self, subscriber: Subscriber, topic: str) -> bool:
+        if topic not in subscriber.topics and len(subscriber.topics) >= self.max_topics:
+            return False
+        subscriber.topics.add(topic)
+        self._topics[topic].add(subscriber)
+        return True
+
+    def unsubscribe(self, subscriber: Subscriber, topic: str):
+        subscriber.topics.discard(topic)
+        subscribers = self._topics.get(topic)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._topics[topic]
+
+    def publish(self, topic: str, event: dict) -> int:
+        """Queue an event for every subscriber of topic; returns how many got it"""
+        self.published += 1
+        delivered = 0
+        for subscriber in list(self._topics.get(topic, ())):
+            try:
+                subscriber.queue.put_nowait({"topic": topic, **event})
+                delivered += 1
+            except asyncio.QueueFull:
+                subscriber.dropped += 1
+                self.dropped += 1
+                if subscriber.dropped >= self.max_dropped:
+                    # Too slow to keep up: stop feeding it; the sender loop
+                    # sees the sentinel once it drains and closes the socket
+                    self.disconnect(subscriber)
+                    self._force_close(subscriber)
+        self.delivered += delivered
+        return delivered
+
+    @staticmethod
+    def _force_close(subscriber: Subscriber):
+        try:
+            subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(None)
+        except (asyncio.QueueEmpty, asyncio.QueueFull):
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "topics": len(self._topics),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped
+        }
+
+def order_topic(order_id: str) -> str:
+    return f"order:{order_id}"
+
+def chat_topic(pair: str) -> str:
+    return f"chat:{pair}"
+
+async def pump(subscriber: Subscriber, send) -> None:
+    """Forward queued events to the socket until the hub closes the subscriber"""
+    while True:
+        event: Optional[dict] = await subscriber.queue.get()
+        if event is None:
+            return
+        await send(event)
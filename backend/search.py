@@ -0,0 +1,34 @@
+import re
+from typing import List, Optional
+
+# Service search runs on a Mongo text index (stemming, stop words and
+# relevance scoring). User input is reduced to plain word tokens first, so
+# quotes, negation and regex metacharacters never reach the query.
+
+MAX_SEARCH_TERMS = 16
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SERVICE_TEXT_INDEX = [("isActive", 1), ("title", "text"), ("description", "text")]
+SERVICE_TEXT_WEIGHTS = {"title": 10, "description": 2}
+
+RELEVANCE_SORT = [("score", {"$meta": "textScore"}), ("_id", 1)]
+RELEVANCE_PROJECTION = {"score": {"$meta": "textScore"}}
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased, de-duplicated word tokens, capped at MAX_SEARCH_TERMS"""
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token not in terms:
+            terms.append(token)
+        if len(terms) == MAX_SEARCH_TERMS:
+            break
+    return terms
+
+def text_search_clause(search: Optional[str]) -> Optional[dict]:
+    """$text filter matching any of the query's terms, or None if it has none"""
+    if not search:
+        return None
+    terms = tokenize(search)
+    if not terms:
+        return None
+    return {"$search": " ".join(terms)}
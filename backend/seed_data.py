@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 from pathlib import Path
 from datetime import datetime, timedelta
 from auth import get_password_hash
+from influencer_summary import summarize
+from order_snapshot import service_snapshot
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -221,6 +223,14 @@ async def seed_database():
         }
     ]
     
+    # Denormalized sort keys used by GET /services
+    ratings = {user_ids[i]: users_data[i]['rating'] for i in range(len(user_ids))}
+    summaries = {user_ids[i]: summarize(users_data[i]) for i in range(len(user_ids))}
+    for service in services_data:
+        service['basicPrice'] = service['packages']['basic']['price']
+        service['influencerRating'] = ratings[service['userId']]
+        service['influencerSummary'] = summaries[service['userId']]
+    
     services_result = await db.services.insert_many(services_data)
     service_ids = [str(id) for id in services_result.inserted_ids]
     print(f"Created {len(service_ids)} services")
@@ -287,6 +297,10 @@ async def seed_database():
         }
     ]
     
+    # Purchased-service snapshots, as create_order stores them
+    for order, service_index, user_index in zip(orders_data, (0, 2), (0, 2)):
+        order['serviceSnapshot'] = service_snapshot(services_data[service_index], order['package'], users_data[user_index])
+    
     orders_result = await db.orders.insert_many(orders_data)
     order_ids = [str(id) for id in orders_result.inserted_ids]
     print(f"Created {len(order_ids)} orders")
@@ -1,4 +1,6 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Query
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect, Header
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -8,22 +10,50 @@ from pathlib import Path
 from typing import List, Optional
 from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
+import asyncio
 import random
 import string
 
 from models import (
-    UserCreate, UserLogin, GoogleAuth, ServiceCreate, OrderCreate, 
+    UserCreate, UserLogin, GoogleAuth, ServiceCreate, ServiceUpdate, OrderCreate, 
     OrderDeliver, OrderRevision, MessageCreate, ReviewCreate, 
     PaymentIntent, PaymentConfirm
 )
 from auth import (
-    get_password_hash, 
-    verify_password, 
+    get_password_hash_async, 
+    verify_password_async, 
     create_access_token, 
+    decode_token,
     get_current_user,
-    get_optional_user
+    get_current_user_or_token,
+    get_optional_user,
+    shutdown_hash_pool,
+    token_cache
 )
+from cache import TTLCache
+from cache_bus import InvalidationBus
+from admin_stats import StatsSnapshot
+from suggest import PrefixIndex
+from loaders import Loaders
+from projections import (
+    parse_fields, field_projection, join_fields, apply_projection,
+    USER_PUBLIC_PROJECTION, USER_CARD_PROJECTION, USER_CONTACT_PROJECTION, USER_LIST_PROJECTION,
+    USER_CARD_FIELDS, SERVICE_LIST_PROJECTION, ORDER_LIST_PROJECTION, service_image_url
+)
+from pagination import fetch_page, page_response, encode_cursor, encode_offset, decode_offset
+from search import text_search_clause, RELEVANCE_SORT, RELEVANCE_PROJECTION
+from indexes import ensure_indexes
+from order_ids import OrderIdGenerator
+from order_states import transition_order
+from ratings import add_review_rating, recompute_ratings
+from influencer_summary import summarize, fan_out, SUMMARY_FIELDS, SUMMARY_PROJECTION
+from order_snapshot import service_snapshot, custom_order_snapshot
+from conversations import record_message, mark_read, rebuild_conversations, pair_key, CONVERSATION_SORT
+from realtime import Hub, order_topic, chat_topic, pump
+from order_events import OrderFeed, encode_event, feed_topic, format_sse
 import base64
+from urllib.parse import unquote_to_bytes
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -47,14 +77,232 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Helper functions
+order_ids = OrderIdGenerator()
+
 def generate_order_id():
-    return f"ORD-{random.randint(1000, 9999)}"
+    """Unique, creation-time-sortable order number shared by orders, campaigns and custom orders"""
+    return order_ids()
 
 def serialize_doc(doc):
     if doc and '_id' in doc:
         doc['_id'] = str(doc['_id'])
     return doc
 
+def basic_price(packages):
+    """Denormalized sort key: the basic package price, else the cheapest one.
+
+    Never None: a null key would break the keyset cursor for price sorts.
+    """
+    packages = packages or {}
+    basic = packages.get('basic')
+    if basic and basic.get('price') is not None:
+        return basic['price']
+    prices = [p['price'] for p in packages.values() if p and p.get('price') is not None]
+    return min(prices) if prices else 0
+
+# DB-side sort for each /services sort mode, with _id as tiebreaker
+SERVICE_SORTS = {
+    "recommended": [("_id", 1)],
+    "price_low": [("basicPrice", 1), ("_id", 1)],
+    "price_high": [("basicPrice", -1), ("_id", -1)],
+    "rating": [("influencerRating", -1), ("_id", -1)]
+}
+
+# Newest-first order for order and campaign listings
+NEWEST_FIRST = [("createdAt", -1), ("_id", -1)]
+
+def get_loaders():
+    """Request-scoped batching loaders; FastAPI builds one set per request"""
+    return Loaders(db, load_profiles, USER_CARD_FIELDS)
+
+def snapshot_service(snapshot: dict, service_projection=None, influencer_projection=USER_CARD_PROJECTION, with_influencer=True):
+    """The service object of an order view, built from its serviceSnapshot"""
+    service = apply_projection(dict(snapshot), service_projection)
+    service.pop('influencer', None)
+    if service_projection is None and 'image' not in snapshot and snapshot.get('_id'):
+        # Listed without its (possibly base64) image; point at the service's
+        service['image'] = service_image_url(snapshot['_id'])
+    if with_influencer and snapshot.get('influencer'):
+        service['influencer'] = apply_projection(snapshot['influencer'], influencer_projection)
+    return service
+
+async def attach_influencers(services, loader, projection=USER_CARD_PROJECTION):
+    """Set service['influencer'] from the embedded influencerSummary.
+
+    Services written before summaries existed fall back to one batched load.
+    """
+    # Rating fan-outs on services that predate summaries leave a partial
+    # summary without _id; treat those as missing
+    missing = [s for s in services if '_id' not in (s.get('influencerSummary') or {})]
+    loaded = await loader.load_many(s.get('userId') for s in missing) if missing else []
+    fallback = {id(s): user for s, user in zip(missing, loaded)}
+    for service in services:
+        summary = service.pop('influencerSummary', None)
+        influencer = fallback.get(id(service)) if id(service) in fallback else apply_projection(summary, projection)
+        if influencer:
+            service['influencer'] = serialize_doc(dict(influencer))
+
+def campaign_influencers(influencers):
+    return [
+        {
+            "_id": str(inf['_id']),
+            "name": inf['name'],
+            "avatar": inf.get('avatar'),
+            "platform": inf.get('platform'),
+            "followers": inf.get('followers')
+        }
+        for inf in influencers if inf
+    ]
+
+# ==================== Principals ====================
+
+# Role and ban flag per user id, so role checks skip the users lookup
+principal_cache = TTLCache(
+    maxsize=int(os.environ.get('PRINCIPAL_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('PRINCIPAL_CACHE_TTL', 60))
+)
+
+async def get_principal(user_id: str):
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    
+    if not ObjectId.is_valid(user_id):
+        return None
+    
+    user = await db.users.find_one(
+        {"_id": ObjectId(user_id)},
+        {"email": 1, "userType": 1, "banned": 1}
+    )
+    if not user:
+        return None
+    
+    principal = {
+        "user_id": user_id,
+        "email": user.get('email'),
+        "userType": user.get('userType'),
+        "banned": user.get('banned', False)
+    }
+    principal_cache.set(user_id, principal)
+    return principal
+
+# User cards (USER_CARD_PROJECTION), shared by all requests. Full profiles
+# and contact details are read from the database, so bios, emails and the
+# like never sit in the cache. Cached documents are never mutated; callers
+# copy before changing them.
+profile_cache = TTLCache(
+    maxsize=int(os.environ.get('USER_CACHE_CAPACITY', 5000)),
+    ttl=float(os.environ.get('USER_CACHE_TTL', 300))
+)
+
+async def load_profiles(user_ids):
+    """User cards by id: cache hits first, one $in query for the rest"""
+    profiles = {}
+    missing = []
+    for user_id in user_ids:
+        profile = profile_cache.get(user_id)
+        if profile is not None:
+            profiles[user_id] = profile
+        elif user_id and ObjectId.is_valid(user_id):
+            missing.append(ObjectId(user_id))
+    
+    if missing:
+        users = await db.users.find({"_id": {"$in": missing}}, USER_CARD_PROJECTION).to_list(len(missing))
+        for user in users:
+            user_id = str(user['_id'])
+            profile_cache.set(user_id, user)
+            profiles[user_id] = user
+    return profiles
+
+async def get_profile(user_id: str):
+    profile = (await load_profiles([user_id])).get(user_id)
+    return serialize_doc(dict(profile)) if profile else None
+
+def evict_user(user_id: str):
+    principal_cache.pop(user_id)
+    profile_cache.pop(user_id)
+
+def require_role(role: str, detail: str):
+    async def dependency(current_user: dict = Depends(get_current_user)):
+        principal = await get_principal(current_user['user_id'])
+        if not principal or principal['userType'] != role or principal['banned']:
+            raise HTTPException(status_code=403, detail=detail)
+        return principal
+    return dependency
+
+require_admin = require_role('admin', "Admin access required")
+require_manager = require_role('manager', "Manager access required")
+
+# ==================== Typeahead Index ====================
+
+# In-memory prefix index behind /search/suggest, built at startup and kept
+# current from the write routes
+suggest_index = PrefixIndex()
+
+def index_service(service):
+    service_id = str(service['_id'])
+    if service.get('isActive') and service.get('status') != 'rejected':
+        suggest_index.add("service", service_id, service['title'], category=service.get('category'))
+    else:
+        suggest_index.remove("service", service_id)
+
+def index_influencer(user):
+    user_id = str(user['_id'])
+    if user.get('userType') == 'seller' and not user.get('banned', False):
+        username = user.get('username') or ''
+        suggest_index.add("influencer", user_id, user['name'], username.lstrip('@'), username=username)
+    else:
+        suggest_index.remove("influencer", user_id)
+
+# ==================== Cache Invalidation ====================
+
+# Local evictions happen inline in the write routes; the bus carries them to
+# every other worker, which evicts and refreshes its own copies
+
+async def on_user_changed(user_id):
+    evict_user(user_id)
+    user = None
+    if ObjectId.is_valid(user_id):
+        user = await db.users.find_one(
+            {"_id": ObjectId(user_id)},
+            {"name": 1, "username": 1, "userType": 1, "banned": 1}
+        )
+    if user:
+        index_influencer(user)
+    else:
+        suggest_index.remove("influencer", user_id)
+
+async def on_service_changed(service_id):
+    service = None
+    if ObjectId.is_valid(service_id):
+        service = await db.services.find_one(
+            {"_id": ObjectId(service_id)},
+            {"title": 1, "category": 1, "isActive": 1, "status": 1}
+        )
+    if service:
+        index_service(service)
+    else:
+        suggest_index.remove("service", service_id)
+
+cache_bus = InvalidationBus(
+    db,
+    {
+        "user": on_user_changed,
+        "service": on_service_changed,
+        "categories": lambda key: category_cache.clear(),
+        "order_event": lambda key: order_feed.relay(key)
+    },
+    size=int(os.environ.get('CACHE_BUS_SIZE', 16 * 1024 * 1024)),
+    enabled=os.environ.get('CACHE_BUS_ENABLED', 'true').lower() == 'true'
+)
+
+async def invalidate_user(user_id: str):
+    evict_user(user_id)
+    await cache_bus.publish("user", user_id)
+
+async def invalidate_service(service_id: str):
+    await cache_bus.publish("service", service_id)
+
 # ==================== Authentication Routes ====================
 
 @api_router.post("/auth/register")
@@ -66,7 +314,7 @@ async def register(user_data: UserCreate):
     
     # Create user
     user_dict = user_data.dict()
-    user_dict['password'] = get_password_hash(user_data.password)
+    user_dict['password'] = await get_password_hash_async(user_data.password)
     user_dict['createdAt'] = datetime.utcnow()
     user_dict['updatedAt'] = datetime.utcnow()
     user_dict['level'] = 'Rising Talent'
@@ -99,7 +347,7 @@ async def register(user_data: UserCreate):
 @api_router.post("/auth/login")
 async def login(credentials: UserLogin):
     user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user['password']):
+    if not user or not await verify_password_async(credentials.password, user['password']):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     user_id = str(user['_id'])
@@ -155,12 +403,11 @@ async def google_auth(auth_data: GoogleAuth):
 
 @api_router.get("/auth/me")
 async def get_me(current_user: dict = Depends(get_current_user)):
-    user = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
+    user = await db.users.find_one({"_id": ObjectId(current_user['user_id'])}, USER_PUBLIC_PROJECTION)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user = serialize_doc(user)
-    user.pop('password', None)
     return user
 
 # ==================== User Routes ====================
@@ -170,13 +417,11 @@ async def get_user(user_id: str):
     if not ObjectId.is_valid(user_id):
         raise HTTPException(status_code=400, detail="Invalid user ID")
     
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, USER_PUBLIC_PROJECTION)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user = serialize_doc(user)
-    user.pop('password', None)
-    return user
+    return serialize_doc(user)
 
 @api_router.get("/users/{user_id}/services")
 async def get_user_services(user_id: str):
@@ -215,11 +460,14 @@ async def update_user(
         {"_id": ObjectId(user_id)},
         {"$set": update_data}
     )
+    await invalidate_user(user_id)
+    if any(field in SUMMARY_FIELDS for field in update_data):
+        await fan_out(db, user_id)
     
     # Get updated user
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, USER_PUBLIC_PROJECTION)
     user = serialize_doc(user)
-    user.pop('password', None)
+    index_influencer(user)
     
     return user
 
@@ -238,26 +486,62 @@ async def upload_profile_image(
 
 # ==================== Category Routes ====================
 
+# Initial catalog, written to the categories collection when it is empty
+DEFAULT_CATEGORIES = [
+    {"id": "1", "name": "Social Media Shoutouts", "icon": "📱"},
+    {"id": "2", "name": "Sponsored Content", "icon": "📸"},
+    {"id": "3", "name": "Brand Collaborations", "icon": "🤝"},
+    {"id": "4", "name": "Video Reviews", "icon": "🎥"},
+    {"id": "5", "name": "Product Unboxing", "icon": "📦"},
+    {"id": "6", "name": "Live Streaming", "icon": "📡"},
+    {"id": "7", "name": "Story Mentions", "icon": "✨"},
+    {"id": "8", "name": "Podcast Features", "icon": "🎙️"}
+]
+
+# Categories with counts, shared by every homepage view for a few seconds
+category_cache = TTLCache(maxsize=1, ttl=float(os.environ.get('CATEGORY_CACHE_TTL', 30)))
+
+async def invalidate_categories():
+    category_cache.clear()
+    await cache_bus.publish("categories")
+
 @api_router.get("/categories")
 async def get_categories():
-    # Count services per category
-    categories = [
-        {"id": "1", "name": "Social Media Shoutouts", "icon": "📱"},
-        {"id": "2", "name": "Sponsored Content", "icon": "📸"},
-        {"id": "3", "name": "Brand Collaborations", "icon": "🤝"},
-        {"id": "4", "name": "Video Reviews", "icon": "🎥"},
-        {"id": "5", "name": "Product Unboxing", "icon": "📦"},
-        {"id": "6", "name": "Live Streaming", "icon": "📡"},
-        {"id": "7", "name": "Story Mentions", "icon": "✨"},
-        {"id": "8", "name": "Podcast Features", "icon": "🎙️"}
-    ]
+    categories = category_cache.get("categories")
+    if categories is not None:
+        return categories
+    
+    catalog = await db.categories.find({}, {"_id": 0}).sort("order", 1).to_list(1000)
     
-    for category in categories:
-        count = await db.services.count_documents({"category": category["name"], "isActive": True})
-        category["count"] = count
+    # Count services per category in one pass
+    counts = {}
+    async for row in db.services.aggregate([
+        {"$match": {"isActive": True}},
+        {"$group": {"_id": "$category", "count": {"$sum": 1}}}
+    ]):
+        counts[row['_id']] = row['count']
     
+    categories = [
+        {
+            "id": category['id'],
+            "name": category['name'],
+            "icon": category.get('icon'),
+            "count": counts.get(category['name'], 0)
+        }
+        for category in catalog
+    ]
+    category_cache.set("categories", categories)
     return categories
 
+# ==================== Search Routes ====================
+
+@api_router.get("/search/suggest")
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50)
+):
+    return suggest_index.search(q, limit)
+
 # ==================== Service Routes ====================
 
 @api_router.get("/services")
@@ -266,45 +550,81 @@ async def get_services(
     category: Optional[str] = None,
     sort: str = "recommended",
     skip: int = 0,
-    limit: int = 50
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    loaders: Loaders = Depends(get_loaders)
 ):
     query = {"isActive": True}
     
-    if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}}
-        ]
+    text_clause = text_search_clause(search)
+    if text_clause:
+        query["$text"] = text_clause
     
     if category:
         query["category"] = category
     
-    # Get services
-    services = await db.services.find(query).skip(skip).limit(limit).to_list(limit)
+    # Get services, sorted by the database before paging. A cursor pages by
+    # keyset; skip is kept for older clients.
+    sort_keys = SERVICE_SORTS.get(sort, SERVICE_SORTS["recommended"])
+    names = parse_fields(fields)
+    with_influencer, influencer_names = join_fields(names, "influencer", USER_CARD_FIELDS)
+    projection = field_projection(
+        names, SERVICE_LIST_PROJECTION,
+        required=["userId"] + [field for field, _ in sort_keys] + (["influencerSummary"] if with_influencer else []),
+        joins=["influencer"]
+    )
+    if sort == "relevance" and text_clause:
+        # Text scores are not stored, so relevance pages carry an offset
+        offset = decode_offset(cursor) if cursor else skip
+        services = await db.services.find(
+            query, {**projection, **RELEVANCE_PROJECTION}
+        ).sort(RELEVANCE_SORT).skip(offset).limit(limit).to_list(limit)
+        next_cursor = encode_offset(offset + limit) if len(services) == limit else None
+    elif cursor is not None:
+        services, next_cursor = await fetch_page(db.services, query, sort_keys, limit, cursor, projection)
+    else:
+        services = await db.services.find(query, projection).sort(sort_keys).skip(skip).limit(limit).to_list(limit)
+        next_cursor = None
     
-    # Get user data for each service
+    # Influencer cards are embedded in each service; no users join
+    if with_influencer:
+        influencer_projection = field_projection(influencer_names, USER_CARD_PROJECTION)
+        await attach_influencers(services, loaders.loader("users", influencer_projection), influencer_projection)
+    else:
+        for service in services:
+            service.pop('influencerSummary', None)
     result = []
     for service in services:
         service = serialize_doc(service)
-        user = await db.users.find_one({"_id": ObjectId(service['userId'])})
-        if user:
-            user = serialize_doc(user)
-            user.pop('password', None)
-            service['influencer'] = user
+        service.pop('score', None)
         result.append(service)
     
-    # Sort
-    if sort == "price_low":
-        result.sort(key=lambda x: x['packages']['basic']['price'])
-    elif sort == "price_high":
-        result.sort(key=lambda x: x['packages']['basic']['price'], reverse=True)
-    elif sort == "rating" and result:
-        result.sort(key=lambda x: x.get('influencer', {}).get('rating', 0), reverse=True)
+    return page_response(result, next_cursor, cursor)
+
+@api_router.get("/services/{service_id}/image")
+async def get_service_image(service_id: str):
+    """The service image listings link to in place of inline base64 data"""
+    if not ObjectId.is_valid(service_id):
+        raise HTTPException(status_code=400, detail="Invalid service ID")
     
-    return result
+    service = await db.services.find_one({"_id": ObjectId(service_id)}, {"image": 1})
+    image = (service or {}).get('image')
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    if not image.startswith("data:"):
+        return RedirectResponse(image)
+    header, _, data = image.partition(',')
+    media_type = header[len("data:"):].split(';')[0] or "application/octet-stream"
+    try:
+        content = base64.b64decode(data) if ';base64' in header else unquote_to_bytes(data)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return Response(content, media_type=media_type, headers={"Cache-Control": "public, max-age=3600"})
 
 @api_router.get("/services/{service_id}")
-async def get_service(service_id: str):
+async def get_service(service_id: str, loaders: Loaders = Depends(get_loaders)):
     if not ObjectId.is_valid(service_id):
         raise HTTPException(status_code=400, detail="Invalid service ID")
     
@@ -312,39 +632,239 @@ async def get_service(service_id: str):
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
     
-    service = serialize_doc(service)
-    
-    # Get user data
-    user = await db.users.find_one({"_id": ObjectId(service['userId'])})
-    if user:
-        user = serialize_doc(user)
-        user.pop('password', None)
-        service['influencer'] = user
+    await attach_influencers([service], loaders.loader("users", USER_CARD_PROJECTION))
     
-    return service
+    return serialize_doc(service)
 
 @api_router.post("/services")
 async def create_service(
     service_data: ServiceCreate,
     current_user: dict = Depends(get_current_user)
 ):
+    owner = await db.users.find_one({"_id": ObjectId(current_user['user_id'])}, SUMMARY_PROJECTION)
+    
     service_dict = service_data.dict()
     service_dict['userId'] = current_user['user_id']
     service_dict['isActive'] = True
+    service_dict['basicPrice'] = basic_price(service_dict['packages'])
+    service_dict['influencerRating'] = owner.get('rating', 0.0) if owner else 0.0
+    if owner:
+        service_dict['influencerSummary'] = summarize(owner)
     service_dict['createdAt'] = datetime.utcnow()
     service_dict['updatedAt'] = datetime.utcnow()
     
     result = await db.services.insert_one(service_dict)
     service_dict['_id'] = str(result.inserted_id)
+    await invalidate_categories()
+    index_service(service_dict)
+    await invalidate_service(service_dict['_id'])
     
     return serialize_doc(service_dict)
 
+@api_router.put("/services/{service_id}")
+async def update_service(
+    service_id: str,
+    service_data: ServiceUpdate,
+    current_user: dict = Depends(get_current_user)
+):
+    if not ObjectId.is_valid(service_id):
+        raise HTTPException(status_code=400, detail="Invalid service ID")
+    
+    service = await db.services.find_one({"_id": ObjectId(service_id)}, {"userId": 1})
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+    
+    if service['userId'] != current_user['user_id']:
+        raise HTTPException(status_code=403, detail="Cannot update other user's service")
+    
+    update_data = service_data.dict(exclude_unset=True)
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No valid fields to update")
+    
+    if 'packages' in update_data:
+        update_data['basicPrice'] = basic_price(update_data['packages'])
+    update_data['updatedAt'] = datetime.utcnow()
+    
+    await db.services.update_one(
+        {"_id": ObjectId(service_id)},
+        {"$set": update_data}
+    )
+    if 'isActive' in update_data or 'category' in update_data:
+        await invalidate_categories()
+    
+    service = await db.services.find_one({"_id": ObjectId(service_id)})
+    index_service(service)
+    await invalidate_service(service_id)
+    return serialize_doc(service)
+
+# ==================== Realtime Routes ====================
+
+hub = Hub(
+    queue_size=int(os.environ.get('WS_QUEUE_SIZE', 100)),
+    max_dropped=int(os.environ.get('WS_MAX_DROPPED', 100))
+)
+order_feed = OrderFeed(hub, size=int(os.environ.get('ORDER_EVENTS_BUFFER', 1000)))
+SSE_KEEPALIVE_SECONDS = 15
+
+async def publish_order_event(order: dict, action: str):
+    """Push an order change to this worker's streams and, via the bus, every other worker's"""
+    event = order_feed.publish(order, action)
+    await cache_bus.publish("order_event", encode_event(event))
+
+async def realtime_topic(user_id: str, command: dict) -> str:
+    """Topic for a subscribe command, checking the user may follow it"""
+    if command.get('orderId'):
+        order_id = command['orderId']
+        if not ObjectId.is_valid(order_id):
+            raise HTTPException(status_code=400, detail="Invalid order ID")
+        order = await db.orders.find_one({"_id": ObjectId(order_id)}, {"buyerId": 1, "sellerId": 1})
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if user_id not in (order['buyerId'], order['sellerId']):
+            raise HTTPException(status_code=403, detail="Access denied")
+        return order_topic(order_id)
+    
+    if command.get('userId'):
+        other = await get_principal(command['userId'])
+        if not other:
+            raise HTTPException(status_code=404, detail="User not found")
+        # The connection's own account may have been deleted or banned since it connected
+        me = await get_principal(user_id)
+        if not me or me['banned']:
+            raise HTTPException(status_code=403, detail="Access denied")
+        if me.get('userType') != 'manager' and other.get('userType') != 'manager':
+            raise HTTPException(status_code=403, detail="At least one party must be a manager")
+        return chat_topic(pair_key(user_id, command['userId']))
+    
+    raise HTTPException(status_code=400, detail="orderId or userId is required")
+
+@api_router.websocket("/ws")
+async def realtime(websocket: WebSocket, token: str = ""):
+    """Push channel for order threads and manager chats.
+
+    Connect with ?token=<jwt>, then send {"action": "subscribe", "orderId": ...}
+    or {"action": "subscribe", "userId": <chat partner>}. New messages arrive
+    as {"topic", "type": "message", "message"}; delivery is at-most-once, so
+    clients resync with the REST history routes after a reconnect.
+    """
+    try:
+        user_id = decode_token(token).get('sub') if token else None
+    except HTTPException:
+        user_id = None
+    principal = await get_principal(user_id) if user_id else None
+    if not principal or principal['banned']:
+        await websocket.close(code=4401)
+        return
+    
+    await websocket.accept()
+    subscriber = hub.connect(user_id)
+    sender = asyncio.ensure_future(pump(subscriber, lambda event: websocket.send_json(jsonable_encoder(event))))
+    
+    def reply(event: dict):
+        try:
+            subscriber.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+    
+    try:
+        while True:
+            receive = asyncio.ensure_future(websocket.receive_json())
+            done, _ = await asyncio.wait({receive, sender}, return_when=asyncio.FIRST_COMPLETED)
+            if sender in done:
+                # Dropped by the hub as a slow consumer, or the send failed
+                receive.cancel()
+                await websocket.close(code=4408)
+                break
+            
+            command = receive.result()
+            action = command.get('action') if isinstance(command, dict) else None
+            if action == 'ping':
+                reply({"type": "pong"})
+                continue
+            if action not in ('subscribe', 'unsubscribe'):
+                reply({"type": "error", "detail": "Unknown action"})
+                continue
+            try:
+                topic = await realtime_topic(user_id, command)
+            except HTTPException as e:
+                reply({"type": "error", "detail": e.detail})
+                continue
+            if action == 'unsubscribe':
+                hub.unsubscribe(subscriber, topic)
+                reply({"type": "unsubscribed", "topic": topic})
+            elif hub.subscribe(subscriber, topic):
+                reply({"type": "subscribed", "topic": topic})
+            else:
+                reply({"type": "error", "detail": "Too many subscriptions"})
+    except (WebSocketDisconnect, ValueError, RuntimeError):
+        pass
+    finally:
+        hub.disconnect(subscriber)
+        sender.cancel()
+
+@api_router.get("/orders/events")
+async def order_events(
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user: dict = Depends(get_current_user_or_token)
+):
+    """Server-Sent Events stream of status changes on the user's orders.
+
+    Authenticates with a bearer header or, for a native EventSource,
+    ?token=<jwt>. Reconnects with Last-Event-ID replay missed events from
+    a bounded buffer; when that is not possible (the buffer has moved on,
+    or the reconnect landed on another worker) a 'reset' event tells the
+    client to reload /orders. Events from other workers arrive over the
+    cache bus, so with CACHE_BUS_ENABLED=false run a single worker.
+    """
+    user_id = current_user['user_id']
+    
+    async def stream():
+        subscriber = hub.connect(user_id)
+        hub.subscribe(subscriber, feed_topic(user_id))
+        try:
+            # Subscribed before replaying, so nothing falls in between;
+            # live events already covered by the replay are skipped
+            seen = order_feed.sequence(last_event_id) or 0
+            if last_event_id:
+                missed = order_feed.replay(user_id, last_event_id)
+                if missed is None:
+                    yield "event: reset\ndata: {}\n\n"
+                else:
+                    for event in missed:
+                        seen = order_feed.sequence(event['id'])
+                        yield format_sse(event)
+            
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    # Dropped by the hub as a slow consumer
+                    return
+                event = item['event']
+                if (order_feed.sequence(event['id']) or 0) > seen:
+                    yield format_sse(event)
+        finally:
+            hub.disconnect(subscriber)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ==================== Order Routes ====================
 
 @api_router.get("/orders")
 async def get_orders(
     role: Optional[str] = Query(None),
-    current_user: dict = Depends(get_current_user)
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
     user_id = current_user['user_id']
     
@@ -355,28 +875,51 @@ async def get_orders(
     else:
         query = {"$or": [{"buyerId": user_id}, {"sellerId": user_id}]}
     
-    orders = await db.orders.find(query).sort("createdAt", -1).to_list(100)
+    names = parse_fields(fields)
+    with_service, service_names = join_fields(names, "service")
+    projection = field_projection(
+        names, ORDER_LIST_PROJECTION,
+        required=["serviceId", "createdAt"] + (["serviceSnapshot"] if with_service else []),
+        joins=["service"]
+    )
+    orders, next_cursor = await fetch_page(db.orders, query, NEWEST_FIRST, limit, cursor, projection)
+    
+    with_influencer, influencer_names = join_fields(service_names, "influencer", USER_CARD_FIELDS)
+    influencer_projection = field_projection(influencer_names, USER_CARD_PROJECTION)
+    service_required = ["userId"] + (["influencerSummary"] if with_influencer else [])
+    service_projection = field_projection(service_names, None, required=service_required, joins=["influencer"])
+    legacy_projection = field_projection(
+        service_names, SERVICE_LIST_PROJECTION, required=service_required, joins=["influencer"]
+    )
+    
+    # Orders carry a snapshot of what was bought; only orders placed before
+    # snapshots existed join services, in one batch
+    services = [None] * len(orders)
+    if with_service:
+        legacy = [i for i, o in enumerate(orders) if not o.get('serviceSnapshot')]
+        loaded = await loaders.loader("services", legacy_projection).load_many(
+            orders[i].get('serviceId') for i in legacy
+        )
+        for i, service in zip(legacy, loaded):
+            services[i] = dict(service) if service else None
+    present = [s for s in services if s]
+    if with_influencer:
+        await attach_influencers(present, loaders.loader("users", influencer_projection), influencer_projection)
+    else:
+        for service in present:
+            service.pop('influencerSummary', None)
     
-    # Enrich with service and user data
     result = []
-    for order in orders:
+    for order, service in zip(orders, services):
         order = serialize_doc(order)
-        
-        # Get service
-        service = await db.services.find_one({"_id": ObjectId(order['serviceId'])})
+        snapshot = order.pop('serviceSnapshot', None)
+        if with_service and snapshot:
+            service = snapshot_service(snapshot, service_projection, influencer_projection, with_influencer)
         if service:
-            service = serialize_doc(service)
-            # Get influencer
-            user = await db.users.find_one({"_id": ObjectId(service['userId'])})
-            if user:
-                user = serialize_doc(user)
-                user.pop('password', None)
-                service['influencer'] = user
-            order['service'] = service
-        
+            order['service'] = serialize_doc(service)
         result.append(order)
     
-    return result
+    return page_response(result, next_cursor, cursor)
 
 @api_router.get("/orders/{order_id}")
 async def get_order(
@@ -396,12 +939,16 @@ async def get_order(
         raise HTTPException(status_code=403, detail="Access denied")
     
     order = serialize_doc(order)
+    snapshot = order.pop('serviceSnapshot', None)
     
-    # Get service data
-    service = await db.services.find_one({"_id": ObjectId(order['serviceId'])})
-    if service:
-        service = serialize_doc(service)
-        order['service'] = service
+    # Service as it was when the order was placed; older orders join it
+    if snapshot:
+        order['service'] = snapshot_service(snapshot)
+    elif order.get('serviceId') and ObjectId.is_valid(order['serviceId']):
+        service = await db.services.find_one({"_id": ObjectId(order['serviceId'])})
+        if service:
+            service.pop('influencerSummary', None)
+            order['service'] = serialize_doc(service)
     
     return order
 
@@ -423,6 +970,10 @@ async def create_order(
     # Calculate delivery date
     delivery_date = datetime.utcnow() + timedelta(days=package['delivery'])
     
+    seller = service.get('influencerSummary')
+    if not seller or '_id' not in seller:
+        seller = await get_profile(service['userId'])
+    
     # Create order
     order_dict = {
         "orderId": generate_order_id(),
@@ -442,11 +993,13 @@ async def create_order(
         "createdAt": datetime.utcnow(),
         "deliveryDate": delivery_date,
         "completedAt": None,
-        "updatedAt": datetime.utcnow()
+        "updatedAt": datetime.utcnow(),
+        "serviceSnapshot": service_snapshot(service, order_data.package, seller)
     }
     
     result = await db.orders.insert_one(order_dict)
     order_dict['_id'] = str(result.inserted_id)
+    await publish_order_event(order_dict, "created")
     
     return serialize_doc(order_dict)
 
@@ -456,62 +1009,23 @@ async def deliver_order(
     delivery_data: OrderDeliver,
     current_user: dict = Depends(get_current_user)
 ):
-    if not ObjectId.is_valid(order_id):
-        raise HTTPException(status_code=400, detail="Invalid order ID")
-    
-    order = await db.orders.find_one({"_id": ObjectId(order_id)})
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    # Check if seller
-    if order['sellerId'] != current_user['user_id']:
-        raise HTTPException(status_code=403, detail="Only seller can deliver")
-    
-    # Update order
-    await db.orders.update_one(
-        {"_id": ObjectId(order_id)},
-        {
-            "$set": {
-                "status": "delivered",
-                "deliveryNote": delivery_data.deliveryNote,
-                "deliveryFiles": delivery_data.deliveryFiles,
-                "updatedAt": datetime.utcnow()
-            }
-        }
+    order = await transition_order(
+        db.orders, order_id, "deliver", current_user['user_id'],
+        {"deliveryNote": delivery_data.deliveryNote, "deliveryFiles": delivery_data.deliveryFiles}
     )
+    await publish_order_event(order, order['status'])
     
-    return {"message": "Order delivered successfully"}
+    return {"message": "Order delivered successfully", "order": serialize_doc(order)}
 
 @api_router.put("/orders/{order_id}/accept")
 async def accept_order(
     order_id: str,
     current_user: dict = Depends(get_current_user)
 ):
-    if not ObjectId.is_valid(order_id):
-        raise HTTPException(status_code=400, detail="Invalid order ID")
+    order = await transition_order(db.orders, order_id, "accept", current_user['user_id'])
+    await publish_order_event(order, order['status'])
     
-    order = await db.orders.find_one({"_id": ObjectId(order_id)})
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    # Check if buyer
-    if order['buyerId'] != current_user['user_id']:
-        raise HTTPException(status_code=403, detail="Only buyer can accept")
-    
-    # Update order
-    await db.orders.update_one(
-        {"_id": ObjectId(order_id)},
-        {
-            "$set": {
-                "status": "completed",
-                "paymentStatus": "released",
-                "completedAt": datetime.utcnow(),
-                "updatedAt": datetime.utcnow()
-            }
-        }
-    )
-    
-    return {"message": "Order completed successfully"}
+    return {"message": "Order completed successfully", "order": serialize_doc(order)}
 
 @api_router.put("/orders/{order_id}/revision")
 async def request_revision(
@@ -519,47 +1033,51 @@ async def request_revision(
     revision_data: OrderRevision,
     current_user: dict = Depends(get_current_user)
 ):
-    if not ObjectId.is_valid(order_id):
-        raise HTTPException(status_code=400, detail="Invalid order ID")
-    
-    order = await db.orders.find_one({"_id": ObjectId(order_id)})
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    # Check if buyer
-    if order['buyerId'] != current_user['user_id']:
-        raise HTTPException(status_code=403, detail="Only buyer can request revision")
-    
-    # Check revisions
-    if order['revisions'] >= order['maxRevisions']:
-        raise HTTPException(status_code=400, detail="No revisions left")
-    
-    # Update order
-    await db.orders.update_one(
-        {"_id": ObjectId(order_id)},
-        {
-            "$set": {
-                "status": "in_progress",
-                "updatedAt": datetime.utcnow()
-            },
-            "$inc": {"revisions": 1}
-        }
+    order = await transition_order(
+        db.orders, order_id, "revision", current_user['user_id'],
+        {"revisionNote": revision_data.revisionNote}
     )
+    await publish_order_event(order, order['status'])
+    
+    return {"message": "Revision requested successfully", "order": serialize_doc(order)}
+
+@api_router.put("/orders/{order_id}/cancel")
+async def cancel_order(
+    order_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    order = await transition_order(db.orders, order_id, "cancel", current_user['user_id'])
+    await publish_order_event(order, order['status'])
     
-    return {"message": "Revision requested successfully"}
+    return {"message": "Order cancelled successfully", "order": serialize_doc(order)}
 
 # ==================== Message Routes ====================
 
+# Chronological order for order threads
+MESSAGE_ORDER = [("createdAt", 1), ("_id", 1)]
+MESSAGE_ORDER_DESC = [("createdAt", -1), ("_id", -1)]
+
 @api_router.get("/messages/{order_id}")
 async def get_messages(
     order_id: str,
-    current_user: dict = Depends(get_current_user)
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
+    """Messages of an order thread, oldest first.
+
+    after=<since> returns only messages newer than a previous response's
+    since watermark (after= with no value starts from the beginning);
+    before=<prevCursor> pages back through older history (before= with no
+    value returns the latest page). Without either, a plain list is returned.
+    """
     if not ObjectId.is_valid(order_id):
         raise HTTPException(status_code=400, detail="Invalid order ID")
     
     # Check authorization
-    order = await db.orders.find_one({"_id": ObjectId(order_id)})
+    order = await db.orders.find_one({"_id": ObjectId(order_id)}, {"buyerId": 1, "sellerId": 1})
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
@@ -567,18 +1085,27 @@ async def get_messages(
     if order['buyerId'] != user_id and order['sellerId'] != user_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    messages = await db.messages.find({"orderId": order_id}).sort("createdAt", 1).to_list(1000)
+    query = {"orderId": order_id}
+    if before is not None:
+        # Newest-first scan below the cursor, returned oldest first
+        messages, prev_cursor = await fetch_page(db.messages, query, MESSAGE_ORDER_DESC, limit, before or None)
+        messages.reverse()
+    else:
+        messages, _ = await fetch_page(db.messages, query, MESSAGE_ORDER, limit, after or None)
+        prev_cursor = None
     
-    # Enrich with sender data
-    result = []
-    for msg in messages:
-        msg = serialize_doc(msg)
-        sender = await db.users.find_one({"_id": ObjectId(msg['senderId'])})
+    # senderName is stored on messages; only older ones need a lookup
+    unnamed = [m for m in messages if 'senderName' not in m]
+    senders = await loaders.users.load_many(m['senderId'] for m in unnamed)
+    for msg, sender in zip(unnamed, senders):
         if sender:
             msg['senderName'] = sender['name']
-        result.append(msg)
     
-    return result
+    since = encode_cursor(messages[-1], MESSAGE_ORDER) if messages else (after or None)
+    result = [serialize_doc(m) for m in messages]
+    if before is None and after is None:
+        return result
+    return {"items": result, "since": since, "prevCursor": prev_cursor}
 
 @api_router.post("/messages")
 async def send_message(
@@ -589,7 +1116,7 @@ async def send_message(
     if not ObjectId.is_valid(message_data.orderId):
         raise HTTPException(status_code=400, detail="Invalid order ID")
     
-    order = await db.orders.find_one({"_id": ObjectId(message_data.orderId)})
+    order = await db.orders.find_one({"_id": ObjectId(message_data.orderId)}, {"buyerId": 1, "sellerId": 1})
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
@@ -597,10 +1124,14 @@ async def send_message(
     if order['buyerId'] != user_id and order['sellerId'] != user_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    # Sender name is stored with the message so reads need no user lookup
+    user = await get_profile(user_id)
+    
     # Create message
     message_dict = {
         "orderId": message_data.orderId,
         "senderId": user_id,
+        "senderName": user['name'] if user else None,
         "message": message_data.message,
         "attachments": message_data.attachments,
         "isRead": False,
@@ -609,28 +1140,24 @@ async def send_message(
     
     result = await db.messages.insert_one(message_dict)
     message_dict['_id'] = str(result.inserted_id)
-    
-    # Get sender name
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
-    if user:
-        message_dict['senderName'] = user['name']
+    hub.publish(order_topic(message_data.orderId), {"type": "message", "message": dict(message_dict)})
     
     return serialize_doc(message_dict)
 
 # ==================== Review Routes ====================
 
 @api_router.get("/reviews/{service_id}")
-async def get_reviews(service_id: str):
+async def get_reviews(service_id: str, loaders: Loaders = Depends(get_loaders)):
     if not ObjectId.is_valid(service_id):
         raise HTTPException(status_code=400, detail="Invalid service ID")
     
     reviews = await db.reviews.find({"serviceId": service_id}).sort("createdAt", -1).to_list(100)
     
     # Enrich with buyer data
+    buyers = await loaders.users.load_many(r['buyerId'] for r in reviews)
     result = []
-    for review in reviews:
+    for review, buyer in zip(reviews, buyers):
         review = serialize_doc(review)
-        buyer = await db.users.find_one({"_id": ObjectId(review['buyerId'])})
         if buyer:
             review['buyerName'] = buyer['name']
             review['buyerAvatar'] = buyer.get('avatar')
@@ -669,25 +1196,17 @@ async def create_review(
         "createdAt": datetime.utcnow()
     }
     
-    result = await db.reviews.insert_one(review_dict)
+    try:
+        result = await db.reviews.insert_one(review_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Already reviewed")
     review_dict['_id'] = str(result.inserted_id)
     
-    # Update service owner's rating
-    service = await db.services.find_one({"_id": ObjectId(review_data.serviceId)})
-    if service:
-        # Calculate new average rating
-        all_reviews = await db.reviews.find({"serviceId": review_data.serviceId}).to_list(1000)
-        avg_rating = sum(r['rating'] for r in all_reviews) / len(all_reviews)
-        
-        await db.users.update_one(
-            {"_id": ObjectId(service['userId'])},
-            {
-                "$set": {
-                    "rating": round(avg_rating, 1),
-                    "reviewCount": len(all_reviews)
-                }
-            }
-        )
+    # Fold the review into the service and seller rating aggregates
+    if ObjectId.is_valid(review_data.serviceId):
+        seller = await add_review_rating(db, review_data.serviceId, review_data.rating, result.inserted_id)
+        if seller:
+            await invalidate_user(str(seller['_id']))
     
     return serialize_doc(review_dict)
 
@@ -716,65 +1235,50 @@ async def confirm_payment(payment_data: PaymentConfirm):
 
 # ==================== Admin Routes ====================
 
+admin_stats = StatsSnapshot(db, interval=float(os.environ.get('ADMIN_STATS_REFRESH_SECONDS', 60)))
+
 @api_router.get("/admin/stats")
-async def get_admin_stats(current_user: dict = Depends(get_current_user)):
-    # Check if user is admin
-    user = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not user or user.get('userType') != 'admin':
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
-    # Get counts
-    total_users = await db.users.count_documents({})
-    total_orders = await db.orders.count_documents({})
-    total_services = await db.services.count_documents({})
-    pending_orders = await db.orders.count_documents({"status": "in_progress"})
-    completed_orders = await db.orders.count_documents({"status": "completed"})
-    active_influencers = await db.users.count_documents({"userType": "seller"})
-    total_campaigns = await db.campaigns.count_documents({})
-    total_managers = await db.users.count_documents({"userType": "manager"})
-    total_chats = await db.manager_chats.count_documents({})
-    
-    # Calculate total revenue
-    orders = await db.orders.find({}).to_list(10000)
-    total_revenue = sum(order.get('price', 0) for order in orders)
-    
-    # Calculate campaign revenue
-    campaigns = await db.campaigns.find({}).to_list(10000)
-    campaign_revenue = sum(campaign.get('budget', 0) for campaign in campaigns)
-    
+async def get_admin_stats(
+    fresh: bool = False,
+    current_user: dict = Depends(require_admin)
+):
+    """Dashboard counters from the materialized snapshot; fresh=true recomputes"""
+    return await admin_stats.get(fresh)
+
+@api_router.get("/admin/cache-stats")
+async def get_cache_stats(current_user: dict = Depends(require_admin)):
     return {
-        "totalUsers": total_users,
-        "totalOrders": total_orders,
-        "totalRevenue": total_revenue + campaign_revenue,
-        "totalServices": total_services,
-        "pendingOrders": pending_orders,
-        "completedOrders": completed_orders,
-        "activeInfluencers": active_influencers,
-        "totalCampaigns": total_campaigns,
-        "totalManagers": total_managers,
-        "totalChats": total_chats
+        "tokens": token_cache.stats(),
+        "principals": principal_cache.stats(),
+        "profiles": profile_cache.stats(),
+        "categories": category_cache.stats(),
+        "suggest": suggest_index.stats(),
+        "bus": cache_bus.stats(),
+        "realtime": hub.stats()
     }
 
+@api_router.post("/admin/ratings/recompute")
+async def recompute_all_ratings(current_user: dict = Depends(require_admin)):
+    """Repair job: rebuild service and seller rating aggregates from reviews"""
+    sellers = await recompute_ratings(db)
+    for seller_id in sellers:
+        await invalidate_user(seller_id)
+    return {"message": "Ratings recomputed", "sellers": len(sellers)}
+
 @api_router.get("/admin/users")
-async def get_all_users(current_user: dict = Depends(get_current_user)):
-    user = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not user or user.get('userType') != 'admin':
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
-    users = await db.users.find({}).to_list(1000)
-    result = []
-    for u in users:
-        u = serialize_doc(u)
-        u.pop('password', None)
-        result.append(u)
-    return result
+async def get_all_users(
+    limit: int = Query(1000, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(require_admin)
+):
+    projection = field_projection(parse_fields(fields), USER_LIST_PROJECTION)
+    users, next_cursor = await fetch_page(db.users, {}, [("_id", 1)], limit, cursor, projection)
+    result = [serialize_doc(u) for u in users]
+    return page_response(result, next_cursor, cursor)
 
 @api_router.put("/admin/users/{user_id}/ban")
-async def ban_user(user_id: str, current_user: dict = Depends(get_current_user)):
-    admin = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not admin or admin.get('userType') != 'admin':
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
+async def ban_user(user_id: str, current_user: dict = Depends(require_admin)):
     user = await db.users.find_one({"_id": ObjectId(user_id)})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -784,107 +1288,117 @@ async def ban_user(user_id: str, current_user: dict = Depends(get_current_user))
         {"_id": ObjectId(user_id)},
         {"$set": {"banned": new_status, "updatedAt": datetime.utcnow()}}
     )
+    await invalidate_user(user_id)
+    await fan_out(db, user_id)
+    user['banned'] = new_status
+    index_influencer(user)
     
     return {"message": f"User {'banned' if new_status else 'unbanned'} successfully"}
 
 @api_router.delete("/admin/users/{user_id}")
-async def delete_user(user_id: str, current_user: dict = Depends(get_current_user)):
-    admin = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not admin or admin.get('userType') != 'admin':
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
+async def delete_user(user_id: str, current_user: dict = Depends(require_admin)):
     await db.users.delete_one({"_id": ObjectId(user_id)})
+    await invalidate_user(user_id)
+    await db.services.update_many({"userId": user_id}, {"$unset": {"influencerSummary": ""}})
+    suggest_index.remove("influencer", user_id)
     return {"message": "User deleted successfully"}
 
 @api_router.get("/admin/services")
-async def get_all_services_admin(current_user: dict = Depends(get_current_user)):
-    admin = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not admin or admin.get('userType') != 'admin':
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
+async def get_all_services_admin(
+    current_user: dict = Depends(require_admin),
+    loaders: Loaders = Depends(get_loaders)
+):
     services = await db.services.find({}).to_list(1000)
-    result = []
-    for service in services:
-        service = serialize_doc(service)
-        user = await db.users.find_one({"_id": ObjectId(service['userId'])})
-        if user:
-            user = serialize_doc(user)
-            user.pop('password', None)
-            service['influencer'] = user
-        result.append(service)
-    return result
+    await attach_influencers(services, loaders.loader("users", USER_CARD_PROJECTION))
+    return [serialize_doc(s) for s in services]
 
 @api_router.put("/admin/services/{service_id}/approve")
-async def approve_service(service_id: str, current_user: dict = Depends(get_current_user)):
-    admin = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not admin or admin.get('userType') != 'admin':
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
+async def approve_service(service_id: str, current_user: dict = Depends(require_admin)):
     await db.services.update_one(
         {"_id": ObjectId(service_id)},
         {"$set": {"status": "approved", "updatedAt": datetime.utcnow()}}
     )
+    await invalidate_categories()
+    service = await db.services.find_one(
+        {"_id": ObjectId(service_id)},
+        {"title": 1, "category": 1, "isActive": 1, "status": 1}
+    )
+    if service:
+        index_service(service)
+    await invalidate_service(service_id)
     return {"message": "Service approved"}
 
 @api_router.put("/admin/services/{service_id}/reject")
-async def reject_service(service_id: str, current_user: dict = Depends(get_current_user)):
-    admin = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not admin or admin.get('userType') != 'admin':
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
+async def reject_service(service_id: str, current_user: dict = Depends(require_admin)):
     await db.services.update_one(
         {"_id": ObjectId(service_id)},
         {"$set": {"status": "rejected", "updatedAt": datetime.utcnow()}}
     )
+    await invalidate_categories()
+    suggest_index.remove("service", service_id)
+    await invalidate_service(service_id)
     return {"message": "Service rejected"}
 
 @api_router.delete("/admin/services/{service_id}")
-async def delete_service_admin(service_id: str, current_user: dict = Depends(get_current_user)):
-    admin = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not admin or admin.get('userType') != 'admin':
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
+async def delete_service_admin(service_id: str, current_user: dict = Depends(require_admin)):
     await db.services.delete_one({"_id": ObjectId(service_id)})
+    await invalidate_categories()
+    suggest_index.remove("service", service_id)
+    await invalidate_service(service_id)
     return {"message": "Service deleted"}
 
 @api_router.get("/admin/orders")
-async def get_all_orders_admin(current_user: dict = Depends(get_current_user)):
-    admin = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not admin or admin.get('userType') != 'admin':
-        raise HTTPException(status_code=403, detail="Admin access required")
+async def get_all_orders_admin(
+    limit: int = Query(1000, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(require_admin),
+    loaders: Loaders = Depends(get_loaders)
+):
+    orders, next_cursor = await fetch_page(db.orders, {}, NEWEST_FIRST, limit, cursor, ORDER_LIST_PROJECTION)
+    
+    # Services come from each order's snapshot; only orders placed before
+    # snapshots existed join services. Both parties of every order load in
+    # one batch.
+    legacy = [o.get('serviceId') if not o.get('serviceSnapshot') else None for o in orders]
+    legacy_projection = {**SERVICE_LIST_PROJECTION, "influencerSummary": 1}
+    services, users = await asyncio.gather(
+        loaders.loader("services", legacy_projection).load_many(legacy),
+        loaders.users.load_many(
+            [o['buyerId'] for o in orders] + [o['sellerId'] for o in orders]
+        )
+    )
+    buyers, sellers = users[:len(orders)], users[len(orders):]
+    services = [dict(service) if service else None for service in services]
+    await attach_influencers([s for s in services if s], loaders.loader("users", USER_CARD_PROJECTION))
     
-    orders = await db.orders.find({}).sort("createdAt", -1).to_list(1000)
     result = []
-    for order in orders:
+    for order, service, buyer, seller in zip(orders, services, buyers, sellers):
         order = serialize_doc(order)
-        service = await db.services.find_one({"_id": ObjectId(order['serviceId'])})
+        snapshot = order.pop('serviceSnapshot', None)
+        if snapshot:
+            service = snapshot_service(snapshot)
         if service:
             order['service'] = serialize_doc(service)
-        buyer = await db.users.find_one({"_id": ObjectId(order['buyerId'])})
         if buyer:
             order['buyerName'] = buyer['name']
-        seller = await db.users.find_one({"_id": ObjectId(order['sellerId'])})
         if seller:
             order['sellerName'] = seller['name']
         result.append(order)
-    return result
+    return page_response(result, next_cursor, cursor)
 
 @api_router.post("/admin/create-manager")
-async def create_manager(manager_data: dict, current_user: dict = Depends(get_current_user)):
-    admin = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not admin or admin.get('userType') != 'admin':
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
+async def create_manager(manager_data: dict, current_user: dict = Depends(require_admin)):
     # Check if email already exists
     existing = await db.users.find_one({"email": manager_data['email']})
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create manager
+    password_hash = await get_password_hash_async(manager_data['password'])
     new_manager = {
         "name": manager_data['name'],
         "email": manager_data['email'],
-        "password": get_password_hash(manager_data['password']),
+        "password": password_hash,
         "userType": "manager",
         "avatar": f"https://api.dicebear.com/7.x/avataaars/svg?seed={manager_data['name']}",
         "username": f"@{manager_data['name'].lower().replace(' ', '')}",
@@ -902,14 +1416,23 @@ async def create_manager(manager_data: dict, current_user: dict = Depends(get_cu
     return {"message": "Manager created successfully", "id": str(result.inserted_id)}
 
 @api_router.get("/admin/campaigns")
-async def get_all_campaigns_admin(current_user: dict = Depends(get_current_user)):
+async def get_all_campaigns_admin(
+    current_user: dict = Depends(require_admin),
+    loaders: Loaders = Depends(get_loaders)
+):
     """Admin: Get all campaigns"""
-    admin = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not admin or admin.get('userType') != 'admin':
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     campaigns = await db.campaigns.find({}).sort("createdAt", -1).to_list(1000)
     
+    # Load every manager and client (with emails) and every influencer card,
+    # one batch each
+    contacts = loaders.loader("users", USER_CONTACT_PROJECTION)
+    contact_ids = set()
+    influencer_ids = set()
+    for campaign in campaigns:
+        contact_ids.update([campaign.get('managerId'), campaign.get('clientId')])
+        influencer_ids.update(campaign.get('influencerIds', []))
+    await asyncio.gather(contacts.load_many(contact_ids), loaders.users.load_many(influencer_ids))
+    
     # Enrich with manager, client, and influencer data
     result = []
     for campaign in campaigns:
@@ -917,105 +1440,63 @@ async def get_all_campaigns_admin(current_user: dict = Depends(get_current_user)
         
         # Get manager info
         if 'managerId' in campaign:
-            manager = await db.users.find_one({"_id": ObjectId(campaign['managerId'])})
+            manager = await contacts.load(campaign['managerId'])
             if manager:
                 campaign['managerName'] = manager['name']
                 campaign['managerEmail'] = manager['email']
         
         # Get client info
         if 'clientId' in campaign:
-            client = await db.users.find_one({"_id": ObjectId(campaign['clientId'])})
+            client = await contacts.load(campaign['clientId'])
             if client:
                 campaign['clientName'] = client['name']
                 campaign['clientEmail'] = client['email']
         
         # Get influencer details
         campaign['influencerCount'] = len(campaign.get('influencerIds', []))
-        influencer_details = []
-        for inf_id in campaign.get('influencerIds', []):
-            inf = await db.users.find_one({"_id": ObjectId(inf_id)})
-            if inf:
-                influencer_details.append({
-                    "_id": str(inf['_id']),
-                    "name": inf['name'],
-                    "avatar": inf.get('avatar'),
-                    "platform": inf.get('platform'),
-                    "followers": inf.get('followers')
-                })
-        campaign['influencers'] = influencer_details
+        campaign['influencers'] = campaign_influencers(
+            await loaders.users.load_many(campaign.get('influencerIds', []))
+        )
         
         result.append(campaign)
     
     return result
 
 @api_router.get("/admin/chats")
-async def get_all_chats_admin(current_user: dict = Depends(get_current_user)):
+async def get_all_chats_admin(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(require_admin),
+    loaders: Loaders = Depends(get_loaders)
+):
     """Admin: Get all chat conversations"""
-    admin = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not admin or admin.get('userType') != 'admin':
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
-    # Get all messages
-    messages = await db.manager_chats.find({}).sort("createdAt", -1).to_list(10000)
-    
-    # Group by conversation pairs
-    conversations_map = {}
-    for msg in messages:
-        sender_id = msg['senderId']
-        recipient_id = msg['recipientId']
-        
-        # Create a unique conversation key (sorted to ensure consistency)
-        conv_key = tuple(sorted([sender_id, recipient_id]))
-        
-        if conv_key not in conversations_map:
-            conversations_map[conv_key] = {
-                "user1Id": conv_key[0],
-                "user2Id": conv_key[1],
-                "messages": [],
-                "lastMessageTime": msg['createdAt'],
-                "messageCount": 1
-            }
-        
-        conversations_map[conv_key]['messages'].append({
-            "senderId": sender_id,
-            "recipientId": recipient_id,
-            "message": msg['message'],
-            "createdAt": msg['createdAt']
-        })
-        conversations_map[conv_key]['messageCount'] += 1
-    
-    # Enrich with user data
+    conversations, next_cursor = await fetch_page(
+        db.conversations, {}, CONVERSATION_SORT, limit, cursor,
+        {"participants": 0, "unread": 0}
+    )
+    
+    # One batched user lookup for every participant on the page; admins
+    # search conversations by email, so it is loaded with the card
+    contacts = loaders.loader("users", USER_CONTACT_PROJECTION)
+    user1s, user2s = await asyncio.gather(
+        contacts.load_many(c['user1Id'] for c in conversations),
+        contacts.load_many(c['user2Id'] for c in conversations)
+    )
+    
     result = []
-    for conv_key, conv_data in conversations_map.items():
-        user1 = await db.users.find_one({"_id": ObjectId(conv_data['user1Id'])})
-        user2 = await db.users.find_one({"_id": ObjectId(conv_data['user2Id'])})
-        
+    for conv, user1, user2 in zip(conversations, user1s, user2s):
         if user1 and user2:
-            user1 = serialize_doc(user1)
-            user2 = serialize_doc(user2)
-            user1.pop('password', None)
-            user2.pop('password', None)
-            
-            conv_data['user1'] = user1
-            conv_data['user2'] = user2
-            # Keep only last 5 messages for preview
-            conv_data['recentMessages'] = conv_data['messages'][-5:]
-            del conv_data['messages']
-            result.append(conv_data)
+            conv['user1'] = serialize_doc(dict(user1))
+            conv['user2'] = serialize_doc(dict(user2))
+            conv['pairKey'] = conv.pop('_id')
+            result.append(conv)
     
-    # Sort by last message time
-    result.sort(key=lambda x: x['lastMessageTime'], reverse=True)
-    
-    return result
+    return page_response(result, next_cursor, cursor)
 
 # ==================== Manager Routes ====================
 
 @api_router.get("/manager/stats")
-async def get_manager_stats(current_user: dict = Depends(get_current_user)):
-    manager = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not manager or manager.get('userType') != 'manager':
-        raise HTTPException(status_code=403, detail="Manager access required")
-    
+async def get_manager_stats(current_user: dict = Depends(require_manager)):
     # Get campaigns created by this manager
     campaigns = await db.campaigns.find({"managerId": current_user['user_id']}).to_list(1000)
     
@@ -1036,40 +1517,38 @@ async def get_manager_stats(current_user: dict = Depends(get_current_user)):
     }
 
 @api_router.get("/manager/influencers")
-async def get_influencers_for_manager(current_user: dict = Depends(get_current_user)):
-    manager = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not manager or manager.get('userType') != 'manager':
-        raise HTTPException(status_code=403, detail="Manager access required")
-    
-    influencers = await db.users.find({"userType": "seller"}).to_list(100)
-    result = []
-    for inf in influencers:
-        inf = serialize_doc(inf)
-        inf.pop('password', None)
-        result.append(inf)
-    return result
+async def get_influencers_for_manager(
+    fields: Optional[str] = None,
+    current_user: dict = Depends(require_manager)
+):
+    projection = field_projection(parse_fields(fields), USER_CARD_PROJECTION)
+    influencers = await db.users.find({"userType": "seller"}, projection).to_list(100)
+    return [serialize_doc(inf) for inf in influencers]
 
 @api_router.get("/manager/clients")
-async def get_clients_for_manager(current_user: dict = Depends(get_current_user)):
-    manager = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not manager or manager.get('userType') != 'manager':
-        raise HTTPException(status_code=403, detail="Manager access required")
-    
-    clients = await db.users.find({"userType": "buyer"}).to_list(100)
-    result = []
-    for client in clients:
-        client = serialize_doc(client)
-        client.pop('password', None)
-        result.append(client)
-    return result
+async def get_clients_for_manager(current_user: dict = Depends(require_manager)):
+    clients = await db.users.find({"userType": "buyer"}, USER_PUBLIC_PROJECTION).to_list(100)
+    return [serialize_doc(client) for client in clients]
 
 @api_router.get("/manager/campaigns")
-async def get_manager_campaigns(current_user: dict = Depends(get_current_user)):
-    manager = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not manager or manager.get('userType') != 'manager':
-        raise HTTPException(status_code=403, detail="Manager access required")
+async def get_manager_campaigns(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(require_manager),
+    loaders: Loaders = Depends(get_loaders)
+):
+    campaigns, next_cursor = await fetch_page(
+        db.campaigns, {"managerId": current_user['user_id']}, NEWEST_FIRST, limit, cursor
+    )
     
-    campaigns = await db.campaigns.find({"managerId": current_user['user_id']}).sort("createdAt", -1).to_list(100)
+    # Load every client (with email) and every influencer card, one batch each
+    contacts = loaders.loader("users", USER_CONTACT_PROJECTION)
+    client_ids = set()
+    influencer_ids = set()
+    for campaign in campaigns:
+        client_ids.add(campaign.get('clientId'))
+        influencer_ids.update(campaign.get('influencerIds', []))
+    await asyncio.gather(contacts.load_many(client_ids), loaders.users.load_many(influencer_ids))
     
     # Enrich with client and influencer data
     result = []
@@ -1078,42 +1557,27 @@ async def get_manager_campaigns(current_user: dict = Depends(get_current_user)):
         
         # Get client info
         if 'clientId' in campaign:
-            client = await db.users.find_one({"_id": ObjectId(campaign['clientId'])})
+            client = await contacts.load(campaign['clientId'])
             if client:
                 campaign['clientName'] = client['name']
                 campaign['clientEmail'] = client['email']
         
         # Get influencer count and details
         campaign['influencerCount'] = len(campaign.get('influencerIds', []))
-        
-        # Get influencer details
-        influencer_details = []
-        for inf_id in campaign.get('influencerIds', []):
-            inf = await db.users.find_one({"_id": ObjectId(inf_id)})
-            if inf:
-                influencer_details.append({
-                    "_id": str(inf['_id']),
-                    "name": inf['name'],
-                    "avatar": inf.get('avatar'),
-                    "platform": inf.get('platform'),
-                    "followers": inf.get('followers')
-                })
-        campaign['influencers'] = influencer_details
+        campaign['influencers'] = campaign_influencers(
+            await loaders.users.load_many(campaign.get('influencerIds', []))
+        )
         
         result.append(campaign)
     
-    return result
+    return page_response(result, next_cursor, cursor)
 
 @api_router.post("/manager/campaigns")
 async def create_campaign(
     campaign_data: dict,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_manager)
 ):
     """Create a campaign (custom order with attached influencers)"""
-    manager = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not manager or manager.get('userType') != 'manager':
-        raise HTTPException(status_code=403, detail="Manager access required")
-    
     # Create campaign
     campaign = {
         "orderId": generate_order_id(),
@@ -1155,51 +1619,38 @@ async def create_campaign(
     }
 
 @api_router.get("/manager/conversations")
-async def get_manager_conversations(current_user: dict = Depends(get_current_user)):
+async def get_manager_conversations(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(require_manager),
+    loaders: Loaders = Depends(get_loaders)
+):
     """Get all conversations for a manager"""
-    manager = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not manager or manager.get('userType') != 'manager':
-        raise HTTPException(status_code=403, detail="Manager access required")
-    
     manager_id = current_user['user_id']
     
-    # Get all unique users the manager has chatted with
-    messages = await db.manager_chats.find({
-        "$or": [
-            {"senderId": manager_id},
-            {"recipientId": manager_id}
-        ]
-    }).sort("createdAt", -1).to_list(10000)
+    conversations, next_cursor = await fetch_page(
+        db.conversations, {"participants": manager_id}, CONVERSATION_SORT, limit, cursor,
+        {"recentMessages": 0}
+    )
     
-    # Group by user
-    conversations_map = {}
-    for msg in messages:
-        other_user_id = msg['recipientId'] if msg['senderId'] == manager_id else msg['senderId']
-        
-        if other_user_id not in conversations_map:
-            conversations_map[other_user_id] = {
-                "userId": other_user_id,
-                "lastMessage": msg['message'],
-                "lastMessageTime": msg['createdAt'],
-                "messageCount": 1
-            }
-        else:
-            conversations_map[other_user_id]['messageCount'] += 1
+    # Managers search their conversations by email, so load it with the card
+    other_ids = [c['user2Id'] if c['user1Id'] == manager_id else c['user1Id'] for c in conversations]
+    users = await loaders.loader("users", USER_CONTACT_PROJECTION).load_many(other_ids)
     
-    # Enrich with user data
     result = []
-    for user_id, conv_data in conversations_map.items():
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
+    for conv, other_id, user in zip(conversations, other_ids, users):
         if user:
-            user = serialize_doc(user)
-            user.pop('password', None)
-            conv_data['otherUser'] = user
-            result.append(conv_data)
-    
-    # Sort by last message time
-    result.sort(key=lambda x: x['lastMessageTime'], reverse=True)
-    
-    return result
+            result.append({
+                "userId": other_id,
+                "lastMessage": conv.get('lastMessage'),
+                "lastMessageTime": conv['lastMessageTime'],
+                "messageCount": conv.get('messageCount', 0),
+                "unreadCount": conv.get('unread', {}).get(manager_id, 0),
+                "otherUser": serialize_doc(dict(user))
+            })
+    
+    # Cursor comes from the stored summary, so skipped users don't shift pages
+    return page_response(result, next_cursor, cursor)
 
 @api_router.get("/managers")
 async def get_all_managers():
@@ -1207,12 +1658,11 @@ async def get_all_managers():
     managers = await db.users.find({
         "userType": "manager",
         "banned": {"$ne": True}
-    }).to_list(100)
+    }, USER_PUBLIC_PROJECTION).to_list(100)
     
     result = []
     for manager in managers:
         manager = serialize_doc(manager)
-        manager.pop('password', None)
         
         # Get manager stats
         campaigns_count = await db.campaigns.count_documents({"managerId": manager['_id']})
@@ -1231,12 +1681,11 @@ async def get_manager_profile(manager_id: str):
     if not ObjectId.is_valid(manager_id):
         raise HTTPException(status_code=400, detail="Invalid manager ID")
     
-    manager = await db.users.find_one({"_id": ObjectId(manager_id), "userType": "manager"})
+    manager = await db.users.find_one({"_id": ObjectId(manager_id), "userType": "manager"}, USER_PUBLIC_PROJECTION)
     if not manager:
         raise HTTPException(status_code=404, detail="Manager not found")
     
     manager = serialize_doc(manager)
-    manager.pop('password', None)
     
     # Get manager stats
     campaigns_count = await db.campaigns.count_documents({"managerId": manager_id})
@@ -1253,8 +1702,8 @@ async def get_manager_profile(manager_id: str):
 async def get_manager_chat(user_id: str, current_user: dict = Depends(get_current_user)):
     """Get chat messages between manager and user (bidirectional)"""
     # Verify at least one party is a manager
-    current_user_data = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    other_user_data = await db.users.find_one({"_id": ObjectId(user_id)})
+    current_user_data = await get_principal(current_user['user_id'])
+    other_user_data = await get_principal(user_id)
     
     if not current_user_data or not other_user_data:
         raise HTTPException(status_code=404, detail="User not found")
@@ -1273,6 +1722,7 @@ async def get_manager_chat(user_id: str, current_user: dict = Depends(get_curren
             {"senderId": user_id, "recipientId": current_user['user_id']}
         ]
     }).sort("createdAt", 1).to_list(1000)
+    await mark_read(db, current_user['user_id'], user_id)
     
     return [serialize_doc(m) for m in messages]
 
@@ -1284,8 +1734,8 @@ async def send_manager_message(
 ):
     """Send message to/from manager (bidirectional)"""
     # Verify at least one party is a manager
-    current_user_data = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    other_user_data = await db.users.find_one({"_id": ObjectId(user_id)})
+    current_user_data = await get_principal(current_user['user_id'])
+    other_user_data = await get_principal(user_id)
     
     if not current_user_data or not other_user_data:
         raise HTTPException(status_code=404, detail="User not found")
@@ -1305,17 +1755,18 @@ async def send_manager_message(
     }
     
     await db.manager_chats.insert_one(message)
+    await record_message(db, message)
+    hub.publish(
+        chat_topic(pair_key(current_user['user_id'], user_id)),
+        {"type": "message", "message": serialize_doc(dict(message))}
+    )
     return {"message": "Message sent successfully"}
 
 @api_router.post("/manager/custom-order")
 async def create_custom_order(
     order_data: dict,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_manager)
 ):
-    manager = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    if not manager or manager.get('userType') != 'manager':
-        raise HTTPException(status_code=403, detail="Manager access required")
-    
     # Create custom order
     custom_order = {
         "orderId": generate_order_id(),
@@ -1336,7 +1787,10 @@ async def create_custom_order(
 # ==================== Custom Order Routes ====================
 
 @api_router.get("/custom-orders")
-async def get_custom_orders(current_user: dict = Depends(get_current_user)):
+async def get_custom_orders(
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
     """Get all custom orders for the current user"""
     user_id = current_user['user_id']
     
@@ -1347,12 +1801,12 @@ async def get_custom_orders(current_user: dict = Depends(get_current_user)):
     }).sort("createdAt", -1).to_list(100)
     
     # Enrich with manager data
+    managers = await loaders.loader("users", USER_CONTACT_PROJECTION).load_many(o['managerId'] for o in custom_orders)
     result = []
-    for order in custom_orders:
+    for order, manager in zip(custom_orders, managers):
         order = serialize_doc(order)
         
         # Get manager info
-        manager = await db.users.find_one({"_id": ObjectId(order['managerId'])})
         if manager:
             order['managerName'] = manager['name']
             order['managerAvatar'] = manager.get('avatar')
@@ -1385,8 +1839,7 @@ async def accept_custom_order(
         raise HTTPException(status_code=400, detail="Order already processed")
     
     # Get recipient user to determine their role
-    recipient = await db.users.find_one({"_id": ObjectId(current_user['user_id'])})
-    manager = await db.users.find_one({"_id": ObjectId(custom_order['managerId'])})
+    recipient = await get_principal(current_user['user_id'])
     
     # Determine buyer and seller based on recipient type
     if recipient.get('userType') == 'buyer':
@@ -1423,6 +1876,7 @@ async def accept_custom_order(
         "managerId": custom_order['managerId'],
         "isCustomOrder": True,
         "customOrderTitle": custom_order['title'],
+        "serviceSnapshot": custom_order_snapshot(custom_order, seller_id, await get_profile(seller_id)),
         "createdAt": datetime.utcnow(),
         "deliveryDate": delivery_date,
         "completedAt": None,
@@ -1431,6 +1885,7 @@ async def accept_custom_order(
     
     # Insert the new order
     await db.orders.insert_one(new_order)
+    await publish_order_event(new_order, "created")
     
     # Update custom order status
     await db.custom_orders.update_one(
@@ -1498,6 +1953,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def create_indexes():
+    await ensure_indexes(db)
+
+@app.on_event("startup")
+async def lease_order_worker_id():
+    await order_ids.lease_worker_id(db)
+
+@app.on_event("startup")
+async def seed_categories():
+    if await db.categories.count_documents({}) > 0:
+        return
+    # Upserts keep this safe when several workers start at once
+    for i, category in enumerate(DEFAULT_CATEGORIES):
+        await db.categories.update_one(
+            {"id": category['id']},
+            {"$setOnInsert": {**category, "order": i}},
+            upsert=True
+        )
+
+@app.on_event("startup")
+async def backfill_conversations():
+    # First start after summaries were introduced: build them from history.
+    # A failure (e.g. a server without $merge) shouldn't stop startup; the
+    # conversations CLI can be run by hand instead.
+    try:
+        if await db.conversations.find_one({}, {"_id": 1}) is None and await db.manager_chats.find_one({}, {"_id": 1}):
+            await rebuild_conversations(db)
+    except OperationFailure as e:
+        logger.error(f"Could not backfill conversations: {e}")
+
+@app.on_event("startup")
+async def build_suggest_index():
+    entries = []
+    async for category in db.categories.find({}, {"id": 1, "name": 1}):
+        entries.append(("category", category['id'], category['name'], (), {}))
+    async for service in db.services.find(
+        {"isActive": True, "status": {"$ne": "rejected"}},
+        {"title": 1, "category": 1}
+    ):
+        entries.append(("service", str(service['_id']), service['title'], (), {"category": service.get('category')}))
+    async for user in db.users.find(
+        {"userType": "seller", "banned": {"$ne": True}},
+        {"name": 1, "username": 1}
+    ):
+        username = user.get('username') or ''
+        entries.append(("influencer", str(user['_id']), user['name'], (username.lstrip('@'),), {"username": username}))
+    
+    suggest_index.clear()
+    suggest_index.load(entries)
+    logger.info(f"Suggest index built with {len(suggest_index)} entries")
+
+@app.on_event("startup")
+async def start_cache_bus():
+    await cache_bus.start()
+
+@app.on_event("startup")
+async def start_admin_stats():
+    await admin_stats.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await cache_bus.stop()
+    await admin_stats.stop()
+    await order_ids.release()
+    client.close()
+    shutdown_hash_pool()
\ No newline at end of file
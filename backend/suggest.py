@@ -0,0 +1,108 @@
+import re
+import sys
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional
+
+# Typeahead over service titles, influencer names/usernames and categories.
+# Each entry is indexed under every word-start suffix of its labels, kept in
+# one sorted list, so a prefix lookup is a bisect plus a short forward scan.
+
+MAX_WORDS_PER_LABEL = 8
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SEP = "\x00"
+
+def normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall((text or "").lower()))
+
+def _terms(labels: Iterable[str]) -> List[str]:
+    terms = set()
+    for label in labels:
+        words = normalize(label).split()[:MAX_WORDS_PER_LABEL]
+        for i in range(len(words)):
+            terms.add(" ".join(words[i:]))
+    return sorted(terms)
+
+def _footprint(keys: List[str], entry: dict) -> int:
+    return sum(sys.getsizeof(key) for key in keys) + sys.getsizeof(entry)
+
+class PrefixIndex:
+    def __init__(self):
+        self._keys: List[str] = []
+        self._entries: Dict[str, dict] = {}
+        self._entry_keys: Dict[str, List[str]] = {}
+        # Size of the indexed strings and entry dicts, kept as entries come
+        # and go so stats() doesn't have to walk the whole index
+        self._item_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, kind: str, entry_id: str, label: str, *aliases: str, **extra):
+        """Index an entry, replacing any previous version of it"""
+        entry_key = f"{kind}:{entry_id}"
+        self.remove(kind, entry_id)
+        keys = [f"{term}{_SEP}{entry_key}" for term in _terms((label,) + aliases)]
+        for key in keys:
+            insort(self._keys, key)
+        self._entries[entry_key] = {"type": kind, "id": entry_id, "label": label, **extra}
+        self._entry_keys[entry_key] = keys
+        self._item_bytes += _footprint(keys, self._entries[entry_key])
+
+    def load(self, entries: Iterable[tuple]):
+        """Bulk-build from (kind, id, label, aliases, extra) tuples with a single sort"""
+        for kind, entry_id, label, aliases, extra in entries:
+            entry_key = f"{kind}:{entry_id}"
+            if entry_key in self._entries:
+                continue
+            keys = [f"{term}{_SEP}{entry_key}" for term in _terms((label,) + tuple(aliases))]
+            self._keys.extend(keys)
+            self._entries[entry_key] = {"type": kind, "id": entry_id, "label": label, **extra}
+            self._entry_keys[entry_key] = keys
+            self._item_bytes += _footprint(keys, self._entries[entry_key])
+        self._keys.sort()
+
+    def remove(self, kind: str, entry_id: str):
+        entry_key = f"{kind}:{entry_id}"
+        keys = self._entry_keys.pop(entry_key, [])
+        for key in keys:
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self._item_bytes -= _footprint(keys, entry)
+
+    def clear(self):
+        self._keys = []
+        self._entries.clear()
+        self._entry_keys.clear()
+        self._item_bytes = 0
+
+    def search(self, query: str, limit: int = 10, kinds: Optional[set] = None) -> List[dict]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        i = bisect_left(self._keys, prefix)
+        while i < len(self._keys) and len(results) < limit:
+            key = self._keys[i]
+            if not key.startswith(prefix):
+                break
+            entry_key = key.rsplit(_SEP, 1)[1]
+            entry = self._entries[entry_key]
+            if entry_key not in seen and (kinds is None or entry['type'] in kinds):
+                seen.add(entry_key)
+                results.append(entry)
+            i += 1
+        return results
+
+    def stats(self) -> dict:
+        """Entry/key counts and an approximate memory footprint in bytes"""
+        container_bytes = sys.getsizeof(self._keys) + sys.getsizeof(self._entries) + sys.getsizeof(self._entry_keys)
+        return {
+            "entries": len(self._entries),
+            "keys": len(self._keys),
+            "approxBytes": container_bytes + self._item_bytes
+        }
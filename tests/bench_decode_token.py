@@ -0,0 +1,45 @@
+"""JWT verification benchmark: get_current_user throughput with and without the token cache.
+
+    python tests/bench_decode_token.py [requests] [distinct_tokens]
+
+Replays requests spread over a pool of distinct tokens, as a busy API
+sees them, once with JWT_CACHE_ENABLED off and once with it on.
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import auth  # noqa: E402
+
+async def run(credentials, requests: int) -> float:
+    started = time.perf_counter()
+    for i in range(requests):
+        await auth.get_current_user(credentials[i % len(credentials)])
+    return requests / (time.perf_counter() - started)
+
+async def main(requests: int, distinct: int):
+    credentials = [
+        HTTPAuthorizationCredentials(
+            scheme="Bearer",
+            credentials=auth.create_access_token({"sub": f"user-{i}", "email": f"user{i}@example.com"})
+        )
+        for i in range(distinct)
+    ]
+
+    print(f"{requests} requests over {distinct} tokens")
+    for enabled in (False, True):
+        auth.JWT_CACHE_ENABLED = enabled
+        auth.token_cache.clear()
+        rate = await run(credentials, requests)
+        print(f"  cache {'on ' if enabled else 'off'}  {rate:10.0f} req/s")
+    print(f"  cache stats {auth.token_cache.stats()}")
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    asyncio.run(main(requests, distinct))
@@ -0,0 +1,93 @@
+"""Service listing pagination: skip vs keyset cursor, shallow and deep.
+
+    MONGO_URL=... python tests/bench_pagination.py [services] [page_size] [runs]
+
+Fills a throwaway database with synthetic services (1M by default), creates
+the registered indexes, and times page 1 and page 10,000 of the price_low
+listing both ways: .skip() as older clients page, and fetch_page with the
+cursor of the previous page. The database is dropped afterwards.
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from indexes import ensure_indexes  # noqa: E402
+from pagination import encode_cursor, fetch_page  # noqa: E402
+
+SORT = [("basicPrice", 1), ("_id", 1)]
+QUERY = {"isActive": True}
+DEEP_PAGE = 10000
+BATCH = 10000
+
+async def fill(services, count: int):
+    rng = random.Random(42)
+    for start in range(0, count, BATCH):
+        await services.insert_many([
+            {
+                "title": f"Service {i}",
+                "category": "Video Reviews",
+                "isActive": True,
+                "basicPrice": rng.randint(10, 1000),
+                "influencerRating": round(rng.uniform(3, 5), 1)
+            }
+            for i in range(start, min(count, start + BATCH))
+        ], ordered=False)
+
+async def timed(runs: int, fetch):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await fetch()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+async def main(count: int, page_size: int, runs: int):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    if 'MONGO_URL' not in os.environ:
+        print("✗ MONGO_URL is not set")
+        sys.exit(1)
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    name = f"bench_pagination_{uuid.uuid4().hex[:8]}"
+    db = client[name]
+    try:
+        started = time.perf_counter()
+        await fill(db.services, count)
+        await ensure_indexes(db)
+        print(f"{count} services inserted and indexed in {time.perf_counter() - started:.1f} s")
+
+        pages = [1, DEEP_PAGE] if count >= DEEP_PAGE * page_size else [1, count // page_size]
+        for page in pages:
+            skip = (page - 1) * page_size
+
+            async def by_skip():
+                return await db.services.find(QUERY).sort(SORT).skip(skip).limit(page_size).to_list(page_size)
+
+            # The cursor a client holds after reading the previous page (not timed)
+            cursor = None
+            if skip:
+                previous = await db.services.find(QUERY).sort(SORT).skip(skip - 1).limit(1).to_list(1)
+                cursor = encode_cursor(previous[0], SORT)
+
+            async def by_cursor():
+                return await fetch_page(db.services, QUERY, SORT, page_size, cursor)
+
+            assert [doc['_id'] for doc in await by_skip()] == [doc['_id'] for doc in (await by_cursor())[0]]
+            print(f"  page {page:>6}  skip {await timed(runs, by_skip):8.2f} ms"
+                  f"  cursor {await timed(runs, by_cursor):8.2f} ms")
+    finally:
+        await client.drop_database(name)
+        client.close()
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    asyncio.run(main(count, page_size, runs))
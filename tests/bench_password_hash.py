@@ -0,0 +1,75 @@
+"""Login hashing benchmark: event-loop lag and throughput, inline vs pool.
+
+    python tests/bench_password_hash.py [logins] [concurrency]
+
+Runs a burst of bcrypt verifications the way /auth/login does, once
+calling verify_password on the loop and once through the process pool,
+while a ticker task measures how late the loop wakes it up.
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import auth  # noqa: E402
+
+TICK_SECONDS = 0.01
+
+async def ticker(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, loop.time() - expected))
+
+async def inline_login(password, hashed):
+    return auth.verify_password(password, hashed)
+
+async def pooled_login(password, hashed):
+    return await auth.verify_password_async(password, hashed)
+
+async def run(login, logins, concurrency, password, hashed):
+    lags = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(lags, stop))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            assert await login(password, hashed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick
+    lags.sort()
+    return {
+        "logins/s": logins / elapsed,
+        "lag p50 ms": statistics.median(lags) * 1000 if lags else 0.0,
+        "lag p99 ms": lags[int(len(lags) * 0.99)] * 1000 if lags else 0.0,
+        "lag max ms": lags[-1] * 1000 if lags else 0.0
+    }
+
+async def main(logins: int, concurrency: int):
+    password = "benchmark-password"
+    hashed = auth.get_password_hash(password)
+
+    # Warm the pool so worker start-up isn't counted against it
+    await asyncio.gather(*(
+        auth.verify_password_async(password, hashed) for _ in range(auth.PASSWORD_HASH_WORKERS)
+    ))
+
+    print(f"{logins} logins, concurrency {concurrency}, {auth.PASSWORD_HASH_WORKERS} hash workers")
+    for name, login in (("inline", inline_login), ("pool", pooled_login)):
+        result = await run(login, logins, concurrency, password, hashed)
+        print(f"  {name:<7}" + "  ".join(f"{key} {value:8.1f}" for key, value in result.items()))
+    auth.shutdown_hash_pool()
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    asyncio.run(main(logins, concurrency))
@@ -0,0 +1,62 @@
+"""Service search latency: text index vs the old regex scan.
+
+    MONGO_URL=... DB_NAME=... python tests/bench_service_search.py [runs]
+
+Times the query GET /services?search=...&sort=relevance issues against the
+configured database (seed it, or point it at a copy of production), next
+to the case-insensitive $regex over title and description it replaced.
+Run `python backend/indexes.py` first so the text index exists.
+"""
+import asyncio
+import os
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from search import RELEVANCE_PROJECTION, RELEVANCE_SORT, text_search_clause  # noqa: E402
+
+QUERIES = ["instagram", "video review", "tech unboxing", "fitness lifestyle content", "zzzz-no-match"]
+LIMIT = 50
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+async def timed(runs, make_cursor):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await make_cursor().to_list(LIMIT)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+async def main(runs: int):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    if 'MONGO_URL' not in os.environ:
+        print("✗ MONGO_URL is not set")
+        sys.exit(1)
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    services = client[os.environ.get('DB_NAME', 'test')].services
+    print(f"{await services.count_documents({})} services, {runs} runs per query")
+
+    for search in QUERIES:
+        text_query = {"isActive": True, "$text": text_search_clause(search)}
+        pattern = re.escape(search)
+        regex_query = {"isActive": True, "$or": [
+            {"title": {"$regex": pattern, "$options": "i"}},
+            {"description": {"$regex": pattern, "$options": "i"}}
+        ]}
+        text = await timed(runs, lambda: services.find(text_query, RELEVANCE_PROJECTION).sort(RELEVANCE_SORT).limit(LIMIT))
+        regex = await timed(runs, lambda: services.find(regex_query).limit(LIMIT))
+        print(f"  {search!r:<30}"
+              f" text p50 {statistics.median(text):7.2f} ms p95 {percentile(text, 0.95):7.2f} ms"
+              f" | regex p50 {statistics.median(regex):7.2f} ms p95 {percentile(regex, 0.95):7.2f} ms")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
@@ -0,0 +1,78 @@
+"""PrefixIndex benchmark: build time, lookup latency and memory footprint.
+
+    python tests/bench_suggest.py [services] [influencers]
+
+Builds the index from synthetic titles and names the size of the catalogue
+you want to plan for, then times prefix lookups and compares the
+tracemalloc-measured footprint with what stats() reports.
+"""
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from suggest import PrefixIndex  # noqa: E402
+
+WORDS = (
+    "instagram tiktok youtube story reel post video review unboxing tech beauty fitness "
+    "travel food gaming lifestyle fashion music shoutout promo launch tutorial vlog podcast "
+    "live stream product brand campaign giveaway collab content creator daily weekly"
+).split()
+CATEGORIES = ["Instagram Posts", "TikTok Videos", "YouTube Reviews", "Story Mentions", "Video Reviews"]
+
+def entries(services: int, influencers: int, rng: random.Random):
+    for i in range(influencers):
+        name = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}"
+        username = f"@{name.lower().replace(' ', '_')}"
+        yield "influencer", f"u{i}", name, (username.lstrip('@'),), {"username": username}
+    for i in range(services):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))).capitalize()
+        yield "service", f"s{i}", title, (), {"category": rng.choice(CATEGORIES)}
+    for i, category in enumerate(CATEGORIES):
+        yield "category", f"c{i}", category, (), {}
+
+def main(services: int, influencers: int):
+    rng = random.Random(42)
+    data = list(entries(services, influencers, rng))
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    started = time.perf_counter()
+    index = PrefixIndex()
+    index.load(data)
+    build = time.perf_counter() - started
+    measured = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, 'filename'))
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for kind, entry_id, label, aliases, extra in data[:1000]:
+        index.add(kind, entry_id, label, *aliases, **extra)
+    update = (time.perf_counter() - started) / min(1000, len(data))
+
+    prefixes = [word[:n] for word in WORDS for n in (1, 2, 4)] + ["zz", "qq"]
+    samples = []
+    for _ in range(20):
+        for prefix in prefixes:
+            started = time.perf_counter()
+            index.search(prefix, limit=10)
+            samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+
+    started = time.perf_counter()
+    stats = index.stats()
+    stats_time = (time.perf_counter() - started) * 1e6
+
+    print(f"{stats['entries']} entries, {stats['keys']} keys")
+    print(f"  build {build * 1000:8.1f} ms   re-add {update * 1e6:8.1f} us/entry")
+    print(f"  search p50 {statistics.median(samples):7.1f} us   p99 {samples[int(len(samples) * 0.99)]:7.1f} us")
+    print(f"  memory tracemalloc {measured / 2**20:7.1f} MiB   stats() {stats['approxBytes'] / 2**20:7.1f} MiB"
+          f" ({stats_time:.1f} us per stats() call)")
+
+if __name__ == "__main__":
+    services = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    influencers = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    main(services, influencers)
@@ -0,0 +1,103 @@
+"""Idle WebSocket load test: hold thousands of /api/ws connections open.
+
+    python tests/load_ws_idle.py --url ws://localhost:8001/api/ws --token <jwt> \\
+        [--connections 10000] [--rate 500] [--hold 60] [--pid <server pid>]
+
+Opens the connections at --rate per second, keeps them idle for --hold
+seconds, pinging a sample to check the server still answers, then closes
+them. With --pid (the uvicorn worker on the same host) it reports the
+server's resident memory before and after, and the cost per connection.
+The client needs one file descriptor per connection; the soft limit is
+raised to the hard limit, which must be above --connections.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import time
+
+import websockets
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+async def open_connection(url: str, latencies: list, failures: list):
+    started = time.perf_counter()
+    try:
+        ws = await websockets.connect(url, ping_interval=None, close_timeout=1, open_timeout=30)
+    except Exception as e:
+        failures.append(type(e).__name__)
+        return None
+    latencies.append(time.perf_counter() - started)
+    return ws
+
+async def ping(ws) -> float:
+    started = time.perf_counter()
+    await ws.send(json.dumps({"action": "ping"}))
+    reply = json.loads(await asyncio.wait_for(ws.recv(), 10))
+    assert reply.get("type") == "pong", reply
+    return time.perf_counter() - started
+
+async def main(args):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if hard < args.connections + 100:
+        print(f"✗ file descriptor limit {hard} is too low for {args.connections} connections")
+        return
+
+    url = f"{args.url}?token={args.token}"
+    before = rss_bytes(args.pid) if args.pid else 0
+    latencies, failures, tasks = [], [], []
+    started = time.perf_counter()
+    for i in range(args.connections):
+        tasks.append(asyncio.ensure_future(open_connection(url, latencies, failures)))
+        if (i + 1) % args.rate == 0:
+            await asyncio.sleep(1)
+    connections = [ws for ws in await asyncio.gather(*tasks) if ws is not None]
+    ramp = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{len(connections)} connected, {len(failures)} failed in {ramp:.1f} s")
+    if failures:
+        print(f"  failures: {', '.join(sorted(set(failures)))}")
+    if latencies:
+        print(f"  connect p50 {statistics.median(latencies) * 1000:.1f} ms"
+              f" p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+
+    # Idle, sampling round trips so a wedged event loop shows up
+    pings = []
+    deadline = time.monotonic() + args.hold
+    while connections and time.monotonic() < deadline:
+        sample = connections[::max(1, len(connections) // 20)]
+        pings.extend(await asyncio.gather(*(ping(ws) for ws in sample)))
+        await asyncio.sleep(min(5, max(0, deadline - time.monotonic())))
+    if pings:
+        pings.sort()
+        print(f"  ping while idle p50 {statistics.median(pings) * 1000:.1f} ms"
+              f" max {pings[-1] * 1000:.1f} ms")
+
+    if args.pid:
+        during = rss_bytes(args.pid)
+        per_connection = (during - before) / len(connections) if connections else 0
+        print(f"  server RSS {before / 2**20:.1f} -> {during / 2**20:.1f} MiB"
+              f" ({per_connection / 1024:.1f} KiB per connection)")
+
+    await asyncio.gather(*(ws.close() for ws in connections), return_exceptions=True)
+    if args.pid:
+        await asyncio.sleep(2)
+        print(f"  server RSS after close {rss_bytes(args.pid) / 2**20:.1f} MiB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="ws://localhost:8001/api/ws")
+    parser.add_argument("--token", required=True, help="JWT of any non-banned user")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--rate", type=int, default=500, help="new connections per second")
+    parser.add_argument("--hold", type=float, default=60, help="seconds to stay connected")
+    parser.add_argument("--pid", type=int, help="server process id, for memory readings")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,181 @@
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect
+
+from cache_bus import InvalidationBus
+
+needs_mongo = pytest.mark.skipif(not os.environ.get('MONGO_URL'), reason="needs MONGO_URL")
+
+WORKERS = 4
+EVENTS = 200
+MAX_P99_LAG_SECONDS = 1.0
+
+def subscriber(collection: str, ready, results, expected: int):
+    """One worker process: tail the bus until every event has arrived"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        received = {}
+        counts = Counter()
+        done = asyncio.Event()
+
+        def on_user(key):
+            counts[key] += 1
+            received.setdefault(key, time.time())
+            if len(received) == expected:
+                done.set()
+
+        bus = InvalidationBus(client[os.environ.get('DB_NAME', 'test')], {"user": on_user}, collection)
+        await bus.start()
+        ready.put(os.getpid())
+        try:
+            await asyncio.wait_for(done.wait(), timeout=30)
+        except asyncio.TimeoutError:
+            pass
+        # Keep tailing a while so redelivered events would be counted
+        await asyncio.sleep(3)
+        await bus.stop()
+        client.close()
+        results.put((received, dict(counts)))
+
+    asyncio.run(run())
+
+@needs_mongo
+def test_invalidations_reach_every_worker_exactly_once():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    collection = f"cache_events_test_{uuid.uuid4().hex[:8]}"
+    context = multiprocessing.get_context('spawn')
+    ready, results = context.Queue(), context.Queue()
+    workers = [
+        context.Process(target=subscriber, args=(collection, ready, results, EVENTS))
+        for _ in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+
+    async def publish():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ.get('DB_NAME', 'test')]
+        bus = InvalidationBus(db, {}, collection)
+        sent = {}
+        try:
+            await bus.start()
+            for _ in range(WORKERS):
+                await asyncio.get_running_loop().run_in_executor(None, ready.get, True, 60)
+            for i in range(EVENTS):
+                key = f"user-{i}"
+                sent[key] = time.time()
+                await bus.publish("user", key)
+            return sent
+        finally:
+            await bus.stop()
+            client.close()
+
+    async def drop():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        await client[os.environ.get('DB_NAME', 'test')].drop_collection(collection)
+        client.close()
+
+    try:
+        sent = asyncio.run(publish())
+        received = [results.get(timeout=60) for _ in workers]
+    finally:
+        for worker in workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        asyncio.run(drop())
+
+    received = [worker_received for worker_received, _ in received]
+    lags = []
+    for worker_received, counts in received:
+        assert set(worker_received) == set(sent)
+        assert set(counts.values()) == {1}
+        lags.extend(worker_received[key] - sent[key] for key in sent)
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)]
+    print(f"propagation lag over {WORKERS} workers: p50 {lags[len(lags) // 2] * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+    assert p99 < MAX_P99_LAG_SECONDS
+
+class StubTailCursor:
+    """Tailable cursor that, like Motor's, ends each async for on an empty batch"""
+
+    def __init__(self, batches, error=None):
+        self.batches = deque(batches)
+        self.error = error
+        self.alive = True
+        self._batch = deque()
+
+    def __aiter__(self):
+        if self.batches:
+            self._batch = deque(self.batches.popleft())
+        return self
+
+    async def __anext__(self):
+        if self._batch:
+            return self._batch.popleft()
+        if not self.batches:
+            if self.error is not None:
+                raise self.error
+            await asyncio.sleep(0.01)
+        raise StopAsyncIteration
+
+class StubCappedCollection:
+    def __init__(self, cursors):
+        self.cursors = deque(cursors)
+        self.queries = []
+
+    def find(self, query, cursor_type=None):
+        self.queries.append(query)
+        return self.cursors.popleft() if self.cursors else StubTailCursor([])
+
+def make_event(key):
+    return {"_id": ObjectId(), "entity": "user", "key": key, "origin": "other", "createdAt": datetime.utcnow()}
+
+def tail(bus, start_id, counts, expected):
+    async def run():
+        task = asyncio.ensure_future(bus._tail(start_id))
+        deadline = time.monotonic() + 5
+        while sum(counts.values()) < expected and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        # Linger so repeats would show up
+        await asyncio.sleep(0.2)
+        task.cancel()
+
+    asyncio.run(run())
+
+def test_empty_batches_do_not_redeliver():
+    first, second = make_event("a"), make_event("b")
+    collection = StubCappedCollection([StubTailCursor([[first], [], [], [second], [], []])])
+    counts = Counter()
+    bus = InvalidationBus({"cache_events": collection}, {"user": lambda key: counts.update([key])})
+
+    tail(bus, first['_id'], counts, 2)
+    assert counts == {"a": 1, "b": 1}
+    assert len(collection.queries) == 1
+    assert bus.reopened == 0
+
+def test_reopened_cursor_skips_events_already_dispatched():
+    events = [make_event(key) for key in "abc"]
+    collection = StubCappedCollection([
+        StubTailCursor([events[:2]], error=AutoReconnect("connection reset")),
+        # The reopened cursor starts a little before the last event seen
+        StubTailCursor([events])
+    ])
+    counts = Counter()
+    bus = InvalidationBus({"cache_events": collection}, {"user": lambda key: counts.update([key])})
+
+    tail(bus, events[0]['_id'], counts, 3)
+    assert counts == {"a": 1, "b": 1, "c": 1}
+    assert bus.reopened == 1
+    assert collection.queries[1]["_id"]["$gte"] <= events[1]['_id']
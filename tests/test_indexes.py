@@ -0,0 +1,30 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from indexes import INDEXES, QUERY_SHAPES, collection_scans, ensure_indexes
+
+pytestmark = pytest.mark.skipif(not os.environ.get('MONGO_URL'), reason="needs MONGO_URL")
+
+def test_registered_query_shapes_use_an_index():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        name = f"test_indexes_{uuid.uuid4().hex[:8]}"
+        db = client[name]
+        try:
+            # explain() on a collection that doesn't exist reports EOF, not
+            # COLLSCAN, so give every collection a document first
+            for collection in {collection for collection, _, _ in INDEXES + QUERY_SHAPES}:
+                await db[collection].insert_one({"_probe": True})
+            await ensure_indexes(db)
+            return await collection_scans(db)
+        finally:
+            await client.drop_database(name)
+            client.close()
+
+    failures = asyncio.run(run())
+    assert failures == [], "\n".join(f"COLLSCAN on {c}: {q} sort={s}" for c, q, s in failures)
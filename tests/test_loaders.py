@@ -0,0 +1,233 @@
+import asyncio
+import os
+
+import pytest
+from bson import ObjectId
+
+from loaders import DataLoader, Loaders, by_id_batch
+from projections import apply_projection
+
+class StubCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+class StubCollection:
+    """Just enough of a Motor collection for by_id_batch, counting find calls"""
+
+    def __init__(self, docs):
+        self.docs = {doc['_id']: doc for doc in docs}
+        self.finds = 0
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        ids = query['_id']['$in']
+        return StubCursor([self.docs[i] for i in ids if i in self.docs])
+
+def make_docs(n):
+    return [{"_id": ObjectId(), "name": f"user {i}"} for i in range(n)]
+
+def test_one_batch_for_many_keys():
+    docs = make_docs(200)
+    collection = StubCollection(docs)
+
+    async def run():
+        loader = DataLoader(by_id_batch(collection))
+        results = await asyncio.gather(*(loader.load(str(doc['_id'])) for doc in docs))
+        return loader, results
+
+    loader, results = asyncio.run(run())
+    assert loader.batches == 1
+    assert collection.finds == 1
+    assert [doc['name'] for doc in results] == [doc['name'] for doc in docs]
+
+class StubListCursor(StubCursor):
+    def sort(self, *args):
+        return self
+
+    def skip(self, n):
+        return self
+
+    def limit(self, n):
+        return self
+
+class StubListCollection:
+    """A services-like collection: any filter returns every document"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.finds = 0
+
+    def find(self, query=None, projection=None):
+        self.finds += 1
+        return StubListCursor([dict(doc) for doc in self.docs])
+
+class StubDB:
+    def __init__(self, **collections):
+        self.collections = collections
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        return self.collections[name]
+
+@pytest.fixture
+def server(monkeypatch):
+    # server.py reads these at import time; nothing connects until a query runs
+    monkeypatch.setenv('MONGO_URL', os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    monkeypatch.setenv('DB_NAME', os.environ.get('DB_NAME', 'test'))
+    import server
+    return server
+
+@pytest.mark.parametrize("n", [1, 20, 100])
+def test_service_listing_round_trips_do_not_grow_with_page_size(server, monkeypatch, n):
+    owners = make_docs(n)
+    services = []
+    for i, owner in enumerate(owners):
+        service = {"_id": ObjectId(), "userId": str(owner['_id']), "title": f"service {i}", "isActive": True}
+        # Every other service predates embedded summaries and needs the users join
+        if i % 2:
+            service["influencerSummary"] = {"_id": str(owner['_id']), "name": owner['name']}
+        services.append(service)
+    db = StubDB(services=StubListCollection(services), users=StubCollection(owners))
+    monkeypatch.setattr(server, "db", db)
+    server.profile_cache.clear()
+
+    result = asyncio.run(server.get_services(
+        search=None, category=None, sort="recommended", skip=0, limit=200,
+        cursor=None, fields=None, loaders=server.get_loaders()
+    ))
+    assert db.services.finds == 1
+    assert db.users.finds == 1
+    assert [service['influencer']['name'] for service in result] == [owner['name'] for owner in owners]
+
+def test_duplicate_and_missing_keys_share_the_batch():
+    docs = make_docs(3)
+    collection = StubCollection(docs)
+    keys = [str(docs[0]['_id']), str(docs[0]['_id']), str(ObjectId()), "not-an-id", str(docs[2]['_id'])]
+
+    async def run():
+        loader = DataLoader(by_id_batch(collection))
+        return loader, await loader.load_many(keys)
+
+    loader, results = asyncio.run(run())
+    assert loader.batches == 1
+    assert collection.finds == 1
+    assert results[0] is results[1]
+    assert results[2] is None and results[3] is None
+    assert results[4]['name'] == "user 2"
+
+def test_memoized_across_ticks():
+    docs = make_docs(5)
+    collection = StubCollection(docs)
+
+    async def run():
+        loader = DataLoader(by_id_batch(collection))
+        await loader.load_many(str(doc['_id']) for doc in docs)
+        await loader.load_many(str(doc['_id']) for doc in docs)
+        return loader
+
+    loader = asyncio.run(run())
+    assert loader.batches == 1
+    assert collection.finds == 1
+
+def test_batch_error_reaches_every_caller_and_is_not_cached():
+    calls = []
+
+    async def failing(keys):
+        calls.append(keys)
+        raise RuntimeError("boom")
+
+    async def run():
+        loader = DataLoader(failing)
+        results = await asyncio.gather(loader.load("a"), loader.load("b"), return_exceptions=True)
+        retry = await asyncio.gather(loader.load("a"), return_exceptions=True)
+        return results, retry
+
+    results, retry = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert isinstance(retry[0], RuntimeError)
+    assert calls == [["a", "b"], ["a"]]
+
+def test_loaders_share_one_loader_per_projection():
+    collections = {"services": StubCollection(make_docs(1))}
+    loaders = Loaders(collections)
+    assert loaders.services is loaders.loader("services")
+    assert loaders.loader("services", {"title": 1}) is not loaders.services
+
+def test_user_loaders_use_the_card_source_only_for_card_fields():
+    docs = make_docs(2)
+    collection = StubCollection(docs)
+    source_calls = []
+
+    async def card_source(keys):
+        source_calls.append(list(keys))
+        return {str(doc['_id']): {"_id": doc['_id'], "name": doc['name']} for doc in docs}
+
+    async def run():
+        loaders = Loaders({"users": collection}, card_source, ["name", "avatar"])
+        ids = [str(doc['_id']) for doc in docs]
+        await loaders.users.load_many(ids)
+        await loaders.loader("users", {"name": 1}).load_many(ids)
+        await loaders.loader("users", {"name": 1, "email": 1}).load_many(ids)
+        await loaders.loader("users", {"password": 0}).load_many(ids)
+
+    asyncio.run(run())
+    assert len(source_calls) == 2
+    assert collection.finds == 2
+
+def test_service_listing_never_joins_private_user_fields(server, monkeypatch):
+    owner = {"_id": ObjectId(), "name": "owner", "email": "owner@example.com", "password": "hash"}
+    services = [{"_id": ObjectId(), "userId": str(owner['_id']), "title": "legacy", "isActive": True}]
+
+    class ProjectingUsers(StubCollection):
+        def find(self, query, projection=None):
+            cursor = super().find(query, projection)
+            cursor.docs = [apply_projection(doc, projection) for doc in cursor.docs]
+            return cursor
+
+    db = StubDB(services=StubListCollection(services), users=ProjectingUsers([owner]))
+    monkeypatch.setattr(server, "db", db)
+    server.profile_cache.clear()
+
+    for fields in ("title,influencer.password,influencer.email", "title,influencer.name,influencer.password"):
+        result = asyncio.run(server.get_services(
+            search=None, category=None, sort="recommended", skip=0, limit=50,
+            cursor=None, fields=fields, loaders=server.get_loaders()
+        ))
+        influencer = result[0].get('influencer') or {}
+        assert 'password' not in influencer and 'email' not in influencer
+
+def test_admin_orders_read_snapshots_and_filter_influencers(server, monkeypatch):
+    buyer, seller = make_docs(2)
+    private = {"_id": str(seller['_id']), "name": seller['name'], "email": "seller@example.com", "phone": "555"}
+    legacy_service = {"_id": ObjectId(), "userId": str(seller['_id']), "title": "live", "influencerSummary": private}
+    orders = [
+        {
+            "_id": ObjectId(), "buyerId": str(buyer['_id']), "sellerId": str(seller['_id']),
+            "serviceId": str(ObjectId()), "createdAt": 1,
+            "serviceSnapshot": {"_id": str(ObjectId()), "title": "snapshot", "influencer": private}
+        },
+        {
+            "_id": ObjectId(), "buyerId": str(buyer['_id']), "sellerId": str(seller['_id']),
+            "serviceId": str(legacy_service['_id']), "createdAt": 0
+        }
+    ]
+    db = StubDB(orders=StubListCollection(orders), services=StubCollection([legacy_service]), users=StubCollection([buyer, seller]))
+    monkeypatch.setattr(server, "db", db)
+
+    page = asyncio.run(server.get_all_orders_admin(
+        limit=50, cursor=None, current_user={}, loaders=server.get_loaders()
+    ))
+    snapshot_order, legacy_order = page
+    assert snapshot_order['service']['title'] == "snapshot"
+    assert legacy_order['service']['title'] == "live"
+    for order in (snapshot_order, legacy_order):
+        assert 'serviceSnapshot' not in order and 'influencerSummary' not in order['service']
+        assert order['service']['influencer'] == {"_id": private['_id'], "name": seller['name']}
+        assert (order['buyerName'], order['sellerName']) == (buyer['name'], seller['name'])
+    # Only the legacy order joins services
+    assert db.services.finds == 1
@@ -0,0 +1,64 @@
+import asyncio
+import json
+from datetime import datetime
+
+from order_events import OrderFeed, encode_event, feed_topic, format_sse
+from realtime import Hub
+
+ORDER = {
+    "_id": "65f000000000000000000001",
+    "orderId": "ORD-0000000000001",
+    "buyerId": "buyer",
+    "sellerId": "seller",
+    "status": "delivered",
+    "paymentStatus": "held",
+    "updatedAt": datetime(2026, 1, 1, 12, 0)
+}
+
+def test_events_reach_buyer_and_seller_and_replay():
+    async def run():
+        hub = Hub()
+        feed = OrderFeed(hub)
+        buyer = hub.connect("buyer")
+        hub.subscribe(buyer, feed_topic("buyer"))
+        first = feed.publish(ORDER, "delivered")
+        second = feed.publish({**ORDER, "status": "completed"}, "completed")
+        assert buyer.queue.qsize() == 2
+        assert feed.replay("buyer", first['id']) == [second]
+        assert feed.replay("seller", first['id']) == [second]
+        assert feed.replay("someone", first['id']) == []
+        assert feed.replay("buyer", "otherepoch-1") is None
+
+    asyncio.run(run())
+
+def test_relayed_events_get_local_ids():
+    async def run():
+        source, target = OrderFeed(Hub()), OrderFeed(Hub())
+        target.publish({**ORDER, "status": "in_progress"}, "created")
+        event = source.publish(ORDER, "delivered")
+        target.relay(encode_event(event))
+        relayed = target.buffer[-1]
+        assert target.sequence(relayed['id']) == 2
+        assert source.sequence(relayed['id']) is None
+        assert {key: value for key, value in relayed.items() if key not in ('id', 'updatedAt')} == {
+            key: value for key, value in event.items() if key not in ('id', 'updatedAt')
+        }
+        assert json.loads(format_sse(relayed).split("data: ")[1]) == json.loads(format_sse(event).split("data: ")[1])
+
+    asyncio.run(run())
+
+def test_replayed_relays_are_dropped():
+    async def run():
+        source, target = OrderFeed(Hub()), OrderFeed(Hub())
+        buyer = target.hub.connect("buyer")
+        target.hub.subscribe(buyer, feed_topic("buyer"))
+        first = source.publish(ORDER, "delivered")
+        second = source.publish({**ORDER, "status": "completed"}, "completed")
+        # The bus redelivers the latest transition after reopening its cursor
+        for payload in (encode_event(first), encode_event(second), encode_event(second)):
+            target.relay(payload)
+        assert [event['originId'] for event in target.buffer] == [first['id'], second['id']]
+        assert buyer.queue.qsize() == 2
+        assert target.seq == 2
+
+    asyncio.run(run())
@@ -0,0 +1,135 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from order_ids import MAX_WORKER, OrderIdGenerator, created_at_ms, decode
+
+PROCESSES = 8
+IDS_PER_PROCESS = 50000
+
+needs_mongo = pytest.mark.skipif(not os.environ.get('MONGO_URL'), reason="needs MONGO_URL")
+
+def generate(worker_id: int, count: int, results):
+    generator = OrderIdGenerator(worker_id)
+    results.put([generator() for _ in range(count)])
+
+def test_ids_are_unique_and_ordered_across_processes():
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    started = int(time.time() * 1000)
+    workers = [
+        context.Process(target=generate, args=(worker_id, IDS_PER_PROCESS, results))
+        for worker_id in range(PROCESSES)
+    ]
+    for worker in workers:
+        worker.start()
+    batches = [results.get(timeout=120) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=10)
+
+    all_ids = [order_id for batch in batches for order_id in batch]
+    assert len(set(all_ids)) == PROCESSES * IDS_PER_PROCESS
+    for batch in batches:
+        assert batch == sorted(batch)
+        assert [decode(order_id) for order_id in batch] == sorted(decode(order_id) for order_id in batch)
+    # The sequence may borrow a few milliseconds ahead under load
+    finished = int(time.time() * 1000)
+    assert all(started <= created_at_ms(order_id) <= finished + 1000 for order_id in all_ids)
+
+def test_ids_are_unique_across_threads():
+    generator = OrderIdGenerator(1)
+    batches = [[] for _ in range(8)]
+
+    def run(batch):
+        for _ in range(20000):
+            batch.append(generator())
+
+    threads = [threading.Thread(target=run, args=(batch,)) for batch in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    all_ids = [order_id for batch in batches for order_id in batch]
+    assert len(set(all_ids)) == len(all_ids)
+    for batch in batches:
+        assert batch == sorted(batch)
+
+def lease(collection: str, results):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        generator = OrderIdGenerator()
+        await generator.lease_worker_id(client[os.environ.get('DB_NAME', 'test')], collection)
+        results.put(generator.worker_id)
+        # Hold the lease until every process has claimed one
+        await asyncio.sleep(2)
+        await generator.release()
+        client.close()
+
+    asyncio.run(run())
+
+@needs_mongo
+def test_concurrent_leases_get_distinct_worker_ids():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    collection = f"order_id_workers_test_{uuid.uuid4().hex[:8]}"
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    workers = [context.Process(target=lease, args=(collection, results)) for _ in range(PROCESSES)]
+    for worker in workers:
+        worker.start()
+    try:
+        worker_ids = [results.get(timeout=60) for _ in workers]
+    finally:
+        for worker in workers:
+            worker.join(timeout=10)
+
+        async def drop():
+            client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+            await client[os.environ.get('DB_NAME', 'test')].drop_collection(collection)
+            client.close()
+        asyncio.run(drop())
+
+    assert len(set(worker_ids)) == PROCESSES
+    assert all(0 <= worker_id <= MAX_WORKER for worker_id in worker_ids)
+
+@needs_mongo
+def test_expired_leases_are_reclaimed_and_live_ones_are_not():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ.get('DB_NAME', 'test')]
+        collection = f"order_id_workers_test_{uuid.uuid4().hex[:8]}"
+        now = datetime.utcnow()
+        # Every id but 0 and 1 is held; 0 is live, 1 belongs to a dead process
+        await db[collection].insert_many(
+            [{"_id": worker_id, "owner": "live", "expiresAt": now + timedelta(minutes=5)} for worker_id in range(MAX_WORKER + 1) if worker_id != 1]
+            + [{"_id": 1, "owner": "dead", "expiresAt": now - timedelta(minutes=5)}]
+        )
+        generator = OrderIdGenerator()
+        try:
+            await generator.lease_worker_id(db, collection)
+            claimed = generator.worker_id
+            owner = (await db[collection].find_one({"_id": 1}))['owner']
+            await generator.release()
+
+            # With every lease live, there is nothing to claim
+            await db[collection].update_one({"_id": 1}, {"$set": {"expiresAt": now + timedelta(minutes=5)}}, upsert=True)
+            with pytest.raises(RuntimeError):
+                await OrderIdGenerator().lease_worker_id(db, collection)
+            return claimed, owner, generator.owner
+        finally:
+            await db.drop_collection(collection)
+            client.close()
+
+    claimed, owner, generator_owner = asyncio.run(run())
+    assert claimed == 1
+    assert owner == generator_owner
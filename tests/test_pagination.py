@@ -0,0 +1,43 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from pagination import decode_offset, encode_cursor, encode_offset, keyset_query
+
+PRICE_LOW = [("basicPrice", 1), ("_id", 1)]
+PRICE_HIGH = [("basicPrice", -1), ("_id", -1)]
+
+def test_ascending_cursor_on_a_value():
+    _id = ObjectId()
+    cursor = encode_cursor({"_id": _id, "basicPrice": 50}, PRICE_LOW)
+    assert keyset_query({}, PRICE_LOW, cursor) == {"$or": [
+        {"basicPrice": {"$gt": 50}},
+        {"basicPrice": 50, "_id": {"$gt": _id}}
+    ]}
+
+def test_ascending_cursor_on_null_keeps_priced_documents():
+    _id = ObjectId()
+    cursor = encode_cursor({"_id": _id}, PRICE_LOW)
+    assert keyset_query({"isActive": True}, PRICE_LOW, cursor) == {"$and": [
+        {"isActive": True},
+        {"$or": [
+            {"basicPrice": {"$ne": None}},
+            {"basicPrice": None, "_id": {"$gt": _id}}
+        ]}
+    ]}
+
+def test_descending_cursor_on_null_only_continues_within_nulls():
+    _id = ObjectId()
+    cursor = encode_cursor({"_id": _id}, PRICE_HIGH)
+    assert keyset_query({}, PRICE_HIGH, cursor) == {"$or": [
+        {"basicPrice": None, "_id": {"$lt": _id}}
+    ]}
+
+def test_offset_cursor_round_trip():
+    assert decode_offset(encode_offset(150)) == 150
+
+@pytest.mark.parametrize("value", [-1, ObjectId(), "10", 1.5, True, None])
+def test_offset_cursor_rejects_non_offsets(value):
+    with pytest.raises(HTTPException) as exc:
+        decode_offset(encode_cursor({"offset": value}, [("offset", 1)]))
+    assert exc.value.status_code == 400
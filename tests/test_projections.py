@@ -0,0 +1,49 @@
+from projections import SERVICE_IMAGE_URL, SERVICE_LIST_PROJECTION, field_projection, join_fields, parse_fields
+
+def test_required_fields_are_added():
+    assert field_projection(["title"], None, required=["userId"]) == {"title": 1, "userId": 1}
+
+def test_default_without_own_fields():
+    default = {"password": 0}
+    assert field_projection(None, default) is default
+    assert field_projection(["influencer.name"], default, joins=["influencer"]) is default
+
+def test_child_of_a_required_field_is_dropped():
+    projection = field_projection(parse_fields("userId.x,title"), None, required=["userId"])
+    assert projection == {"title": 1, "userId": 1}
+
+def test_child_of_a_selected_field_is_dropped():
+    projection = field_projection(["packages.basic.price", "packages", "title"], None)
+    assert projection == {"packages": 1, "title": 1}
+
+def test_required_child_of_a_selected_field_is_dropped():
+    projection = field_projection(["packages"], None, required=["packages.basic.price", "_id"])
+    assert projection == {"packages": 1, "_id": 1}
+
+def test_siblings_with_a_shared_prefix_are_kept():
+    projection = field_projection(["user", "userId", "packages.basic", "packages.premium"], None)
+    assert projection == {"user": 1, "userId": 1, "packages.basic": 1, "packages.premium": 1}
+
+def test_join_fields():
+    assert join_fields(None, "influencer") == (True, None)
+    assert join_fields(["title"], "influencer") == (False, None)
+    assert join_fields(["influencer"], "influencer") == (True, None)
+    assert join_fields(["influencer.name", "title"], "influencer") == (True, ["name"])
+
+def test_private_fields_are_dropped_at_any_depth():
+    assert parse_fields("title,password,influencer.password,service.influencer.password.x") == ["title"]
+
+def test_join_fields_outside_the_whitelist_are_ignored():
+    names = parse_fields("title,influencer.password,influencer.email,influencer.name")
+    assert join_fields(names, "influencer", ["name", "avatar"]) == (True, ["name"])
+    assert join_fields(["influencer.email"], "influencer", ["name"]) == (False, None)
+
+def test_inclusion_default_gets_required_fields():
+    projection = field_projection(None, SERVICE_LIST_PROJECTION, required=["userId", "basicPrice", "_id", "influencerSummary"])
+    assert projection["image"] == SERVICE_IMAGE_URL
+    assert projection["influencerSummary"] == 1 and projection["_id"] == 1
+    assert "packages" not in projection and "ratingHistogram" not in projection
+
+def test_inclusion_default_drops_required_children():
+    projection = field_projection([], {"packages": 1, "title": 1}, required=["packages.basic.price"])
+    assert projection == {"packages": 1, "title": 1}
@@ -0,0 +1,74 @@
+import asyncio
+
+from bson import ObjectId
+
+from ratings import _add_rating, add_review_rating
+
+class AsyncRows:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.rows:
+            raise StopAsyncIteration
+        return self.rows.pop(0)
+
+class StubServices:
+    def __init__(self, doc):
+        self.doc = doc
+        self.updates = []
+
+    async def find_one(self, query, projection=None):
+        return self.doc
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        self.updates.append(update)
+        return {"_id": self.doc['_id'], "userId": str(ObjectId())}
+
+class StubReviews:
+    def __init__(self, rows):
+        self.rows = rows
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return AsyncRows(self.rows)
+
+class StubUsers:
+    async def find_one_and_update(self, query, update, **kwargs):
+        return None
+
+class StubDB:
+    def __init__(self, service, review_rows):
+        self.services = StubServices(service)
+        self.reviews = StubReviews(review_rows)
+        self.users = StubUsers()
+
+def seeds(pipeline):
+    """The $ifNull fallback of every field the first stage sets"""
+    return {field: expr["$add"][0]["$ifNull"][1] for field, expr in pipeline[0]["$set"].items()}
+
+def test_first_rating_on_a_reviewed_service_starts_from_its_reviews():
+    service_id, review_id = ObjectId(), ObjectId()
+    db = StubDB({"_id": service_id}, [{"_id": 5, "count": 3}, {"_id": 2, "count": 1}])
+
+    asyncio.run(add_review_rating(db, str(service_id), 4, review_id))
+
+    assert db.reviews.pipelines[0][0]["$match"] == {"serviceId": str(service_id), "_id": {"$ne": review_id}}
+    assert seeds(db.services.updates[0]) == {
+        "ratingSum": 17, "ratingCount": 4,
+        "ratingHistogram.1": 0, "ratingHistogram.2": 1, "ratingHistogram.3": 0,
+        "ratingHistogram.4": 0, "ratingHistogram.5": 3
+    }
+
+def test_services_with_aggregates_skip_the_reviews_scan():
+    service_id = ObjectId()
+    db = StubDB({"_id": service_id, "ratingCount": 7}, [])
+
+    asyncio.run(add_review_rating(db, str(service_id), 4, ObjectId()))
+
+    assert db.reviews.pipelines == []
+    assert db.services.updates[0] == _add_rating(4, 0, 0)
@@ -0,0 +1,33 @@
+import asyncio
+import os
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+@pytest.fixture
+def server(monkeypatch):
+    # server.py reads these at import time; nothing connects until a query runs
+    monkeypatch.setenv('MONGO_URL', os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    monkeypatch.setenv('DB_NAME', os.environ.get('DB_NAME', 'test'))
+    import server
+    return server
+
+def principals(monkeypatch, server, users):
+    async def get_principal(user_id):
+        return users.get(user_id)
+    monkeypatch.setattr(server, "get_principal", get_principal)
+
+def test_chat_subscribe_from_a_deleted_or_banned_account_is_forbidden(server, monkeypatch):
+    me, manager = str(ObjectId()), str(ObjectId())
+    other = {"user_id": manager, "userType": "manager", "banned": False}
+
+    for mine in (None, {"user_id": me, "userType": "buyer", "banned": True}):
+        principals(monkeypatch, server, {manager: other, me: mine} if mine else {manager: other})
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(server.realtime_topic(me, {"action": "subscribe", "userId": manager}))
+        assert e.value.status_code == 403
+
+    principals(monkeypatch, server, {manager: other, me: {"user_id": me, "userType": "buyer", "banned": False}})
+    topic = asyncio.run(server.realtime_topic(me, {"action": "subscribe", "userId": manager}))
+    assert topic == server.chat_topic(server.pair_key(me, manager))
@@ -0,0 +1,38 @@
+import sys
+
+from suggest import PrefixIndex
+
+def full_footprint(index):
+    """What stats() used to compute by walking every key and entry"""
+    return (
+        sys.getsizeof(index._keys) + sum(sys.getsizeof(k) for k in index._keys)
+        + sys.getsizeof(index._entries) + sys.getsizeof(index._entry_keys)
+        + sum(sys.getsizeof(e) for e in index._entries.values())
+    )
+
+def test_prefix_lookup():
+    index = PrefixIndex()
+    index.add("service", "1", "Instagram story shoutout", category="Story Mentions")
+    index.add("influencer", "2", "Sarah Johnson", "sarahj", username="@sarahj")
+    assert [e['id'] for e in index.search("insta")] == ["1"]
+    assert [e['id'] for e in index.search("story")] == ["1"]
+    assert [e['id'] for e in index.search("sarahj")] == ["2"]
+    assert index.search("insta", kinds={"influencer"}) == []
+
+def test_footprint_tracks_adds_and_removes():
+    index = PrefixIndex()
+    index.load([
+        ("service", str(i), f"Video review number {i}", (), {"category": "Video Reviews"})
+        for i in range(50)
+    ])
+    assert index.stats()["approxBytes"] == full_footprint(index)
+
+    index.add("service", "3", "Renamed tech unboxing", category="Video Reviews")
+    index.add("influencer", "u1", "Mike Chen", "mikechen", username="@mikechen")
+    index.remove("service", "7")
+    index.remove("service", "missing")
+    assert index.stats()["approxBytes"] == full_footprint(index)
+    assert index.stats()["entries"] == 50
+
+    index.clear()
+    assert index.stats()["approxBytes"] == full_footprint(index)